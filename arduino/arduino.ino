@@ -13,6 +13,11 @@
 #define BLUETOOTH_RX A0
 #define BLUETOOTH_TX A1
 
+#define PROTOCOL_VERSION 2
+// Replies wait until no byte has arrived for this long (about 3 characters at 9600 baud).
+#define RX_IDLE_MS 3
+#define MAX_PENDING_REPLIES 64
+
 
 
 
@@ -20,6 +25,15 @@
 
 SoftwareSerial bluetooth(BLUETOOTH_RX, BLUETOOTH_TX); // RX, TX
 
+bool motionActive = false;
+unsigned long motionStartedAt = 0;
+unsigned long motionDuration = 0;
+
+// SoftwareSerial blocks interrupts while it transmits, so a byte received
+// during an echo is lost. Replies are queued and sent once RX is idle.
+String pendingReplies = "";
+unsigned long lastReceivedAt = 0;
+
 void setup() {
   
   pinMode(RIGHT_MOTOR_PIN1, OUTPUT);
@@ -40,13 +54,79 @@ void loop() {
   if (bluetooth.available()) {
     String command = bluetooth.readStringUntil('\n');
     processCommand(command);
+    lastReceivedAt = millis();
+  }
+  if (pendingReplies.length() > 0 && !bluetooth.available() && millis() - lastReceivedAt >= RX_IDLE_MS) {
+    bluetooth.print(pendingReplies);
+    pendingReplies = "";
+  }
+  if (motionActive && millis() - motionStartedAt >= motionDuration) {
+    motionActive = false;
+    stopMotors();
+  }
+}
+
+// A full queue drops the reply; the host treats it as a lost echo.
+void queueReply(String reply) {
+  if (pendingReplies.length() + reply.length() + 2 <= MAX_PENDING_REPLIES) {
+    pendingReplies += reply;
+    pendingReplies += "\r\n";
   }
 }
 
+byte frameChecksum(String payload) {
+  byte value = 0;
+  for (unsigned int i = 0; i < payload.length(); i++) {
+    value ^= payload[i];
+  }
+  return value;
+}
+
+// Framed commands look like "opcode,duration_ms*CK" where CK is the XOR of
+// the payload bytes in hex. Bare opcodes are still accepted from old hosts.
 void processCommand(String command) {
   command.trim();
-  String action = command;
   Serial.println(command);
+  if (command == "V") {
+    queueReply("V" + String(PROTOCOL_VERSION));
+    return;
+  }
+
+  int star = command.indexOf('*');
+  if (star < 0) {
+    runAction(command);
+    queueReply(command);
+    return;
+  }
+
+  String payload = command.substring(0, star);
+  if (frameChecksum(payload) != (byte) strtol(command.substring(star + 1).c_str(), NULL, 16)) {
+    queueReply("ERR");
+    return;
+  }
+
+  int comma = payload.indexOf(',');
+  String action = comma < 0 ? payload : payload.substring(0, comma);
+  long duration = comma < 0 ? 0 : payload.substring(comma + 1).toInt();
+  // A framed motion without a positive duration would never time out, so it stops instead.
+  if (duration <= 0 && action != "5" && action != "6") {
+    action = "0";
+  }
+  runAction(action);
+  queueReply(command);
+  if (duration > 0 && action != "0") {
+    motionStartedAt = millis();
+    motionDuration = duration;
+    motionActive = true;
+  }
+}
+
+void runAction(String action) {
+  if (action != "5" && action != "6") {
+    // Clear indicators and reverse lights left over from the previous motion.
+    motionActive = false;
+    stopMotors();
+  }
   if (action=="1") {
     moveForward();
   } else if (action=="2") {
@@ -55,6 +135,14 @@ void processCommand(String command) {
     turnRight();
   } else if (action=="4") {
     turnLeft();
+  } else if (action == "7") {
+    arcForwardLeft();
+  } else if (action == "8") {
+    arcForwardRight();
+  } else if (action == "9") {
+    arcBackwardLeft();
+  } else if (action == "10") {
+    arcBackwardRight();
   } else if (action == "5") {
     digitalWrite(WHITE_LED_PIN, HIGH);
   } else if (action == "6") {
@@ -99,6 +187,43 @@ void turnLeft() {
   digitalWrite(LEFT_INDICATOR_PIN, HIGH);
     
 }
+// Arcs drive one side only so the host can send combined key presses.
+void arcForwardLeft() {
+  digitalWrite(LEFT_MOTOR_PIN1, LOW);
+  digitalWrite(LEFT_MOTOR_PIN2, HIGH);
+  digitalWrite(RIGHT_MOTOR_PIN1, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN2, LOW);
+  digitalWrite(LEFT_INDICATOR_PIN, HIGH);
+}
+
+void arcForwardRight() {
+  digitalWrite(LEFT_MOTOR_PIN1, LOW);
+  digitalWrite(LEFT_MOTOR_PIN2, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN1, HIGH);
+  digitalWrite(RIGHT_MOTOR_PIN2, LOW);
+  digitalWrite(RIGHT_INDICATOR_PIN, HIGH);
+}
+
+void arcBackwardLeft() {
+  digitalWrite(LEFT_MOTOR_PIN1, LOW);
+  digitalWrite(LEFT_MOTOR_PIN2, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN1, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN2, HIGH);
+  digitalWrite(LEFT_INDICATOR_PIN, HIGH);
+  digitalWrite(RED_LED_PIN, HIGH);
+  digitalWrite(BUZZER_PIN, HIGH);
+}
+
+void arcBackwardRight() {
+  digitalWrite(LEFT_MOTOR_PIN1, HIGH);
+  digitalWrite(LEFT_MOTOR_PIN2, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN1, LOW);
+  digitalWrite(RIGHT_MOTOR_PIN2, LOW);
+  digitalWrite(RIGHT_INDICATOR_PIN, HIGH);
+  digitalWrite(RED_LED_PIN, HIGH);
+  digitalWrite(BUZZER_PIN, HIGH);
+}
+
 void stopMotors() {
   digitalWrite(RIGHT_MOTOR_PIN1, LOW);
   digitalWrite(RIGHT_MOTOR_PIN2, LOW);
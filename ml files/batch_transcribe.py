@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from rich.console import Console
+from rich.table import Table
+from car_engine.console import use_plain_output
+from car_engine.core import build_command, command_mapping
+from car_engine.linear_model import load_classifier, classify_many
+from car_engine.quantities import parse
+from car_engine.vad import VoiceActivityGate
+from car_engine.vosk_frontend import (build_grammar, create_recognizer, default_model_path, load_vosk_model,
+                                     supports_grammar)
+from car_engine.wav_frontend import collect_wavs
+
+console = Console()
+
+chunk_frames = 4000
+
+# Per-process state, filled in once by init_worker.
+worker = {}
+
+
+def init_worker(vosk_model_path, classifier_path, use_grammar, split, min_confidence, vad_settings):
+    use_plain_output()
+    worker["vosk_model"] = load_vosk_model(vosk_model_path)
+    worker["classifier"] = load_classifier(classifier_path)
+    classify_many(worker["classifier"], ["warm up"])
+    worker["grammar"] = build_grammar() if use_grammar else None
+    worker["split"] = split
+    worker["min_confidence"] = min_confidence
+    worker["vad_settings"] = vad_settings
+
+
+def plan_transcript(text):
+    clauses = parse(text)
+    predictions = classify_many(worker["classifier"], [clause.text for clause in clauses])
+    plan = []
+    details = []
+    for clause, (action, confidence) in zip(clauses, predictions):
+        accepted = action in command_mapping and (
+            confidence is None or confidence >= worker["min_confidence"])
+        if accepted:
+            plan.append(list(build_command(action, clause)))
+        details.append({"clause": clause.text, "action": action, "accepted": accepted,
+                        "confidence": None if confidence is None else round(float(confidence), 4),
+                        "slots": [[round(q.value, 3), q.unit] for q in clause.quantities]})
+    return plan, details
+
+
+def read_reference(path):
+    reference = os.path.splitext(path)[0] + '.txt'
+    if not os.path.exists(reference):
+        return None
+    with open(reference) as f:
+        return f.read().strip().lower()
+
+
+def utterance_record(path, index, start, end, texts, decode_ms, decode_cpu):
+    text = " ".join(t for t in texts if t)
+    started = time.perf_counter()
+    plan, clauses = plan_transcript(text) if text else ([], [])
+    classify_ms = (time.perf_counter() - started) * 1000
+    audio = end - start
+    return {
+        "file": path,
+        "segment": index,
+        "start_s": round(start, 3),
+        "end_s": round(end, 3),
+        "transcript": text,
+        "plan": plan,
+        "clauses": clauses,
+        "timings_ms": {"decode": round(decode_ms, 2), "classify": round(classify_ms, 2)},
+        "decode_cpu_s": round(decode_cpu, 4),
+        "rtf": round(decode_cpu / audio, 4) if audio else None,
+    }
+
+
+def transcribe_file(path):
+    started = time.perf_counter()
+    try:
+        wf = wave.open(path, 'rb')
+    except (OSError, wave.Error) as e:
+        return [{"file": path, "error": str(e)}]
+    with wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            return [{"file": path, "error": "expected 16-bit mono PCM"}]
+        rate = wf.getframerate()
+        recognizer = create_recognizer(worker["vosk_model"], rate, worker["grammar"])
+        gate = VoiceActivityGate(*worker["vad_settings"]) if worker["split"] else None
+
+        records = []
+        texts = []
+        position = 0
+        segment_start = 0
+        decode_ms = 0.0
+        decode_cpu = 0.0
+        vad_ms = 0.0
+        while True:
+            data = wf.readframes(chunk_frames)
+            if len(data) == 0:
+                break
+            position += len(data) // 2
+
+            if gate:
+                gate_started = time.perf_counter()
+                was_active = gate.active
+                chunks, segment_ended = gate.process(data)
+                vad_ms += (time.perf_counter() - gate_started) * 1000
+                if chunks and not was_active:
+                    segment_start = position - sum(len(chunk) for chunk in chunks) // 2
+            else:
+                chunks, segment_ended = [data], False
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            for chunk in chunks:
+                if recognizer.AcceptWaveform(chunk):
+                    texts.append(json.loads(recognizer.Result()).get("text", ""))
+            if segment_ended:
+                texts.append(json.loads(recognizer.FinalResult()).get("text", ""))
+                recognizer.Reset()
+            decode_ms += (time.perf_counter() - wall) * 1000
+            decode_cpu += time.process_time() - cpu
+
+            if segment_ended:
+                records.append(utterance_record(path, len(records), segment_start / rate, position / rate,
+                                                texts, decode_ms, decode_cpu))
+                texts, decode_ms, decode_cpu = [], 0.0, 0.0
+
+        if not gate or gate.active:
+            wall, cpu = time.perf_counter(), time.process_time()
+            texts.append(json.loads(recognizer.FinalResult()).get("text", ""))
+            decode_ms += (time.perf_counter() - wall) * 1000
+            decode_cpu += time.process_time() - cpu
+            records.append(utterance_record(path, len(records), segment_start / rate if gate else 0.0,
+                                            position / rate, texts, decode_ms, decode_cpu))
+
+    reference = None if gate else read_reference(path)
+    for record in records:
+        record["timings_ms"]["vad"] = round(vad_ms / len(records), 2) if gate else 0.0
+        record["timings_ms"]["file_total"] = round((time.perf_counter() - started) * 1000, 2)
+        record["worker"] = os.getpid()
+        if reference is not None:
+            record["reference"] = reference
+            record["reference_plan"], _ = plan_transcript(reference)
+            record["plan_match"] = record["plan"] == record["reference_plan"]
+    return records
+
+
+def print_summary(records, wall_seconds, workers):
+    utterances = [r for r in records if "error" not in r]
+    errors = len(records) - len(utterances)
+    audio = sum(r["end_s"] - r["start_s"] for r in utterances)
+    cpu = sum(r["decode_cpu_s"] for r in utterances)
+    checked = [r for r in utterances if "plan_match" in r]
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Metric")
+    table.add_column("Value")
+    table.add_row("Utterances", str(len(utterances)))
+    table.add_row("Unreadable files", str(errors))
+    table.add_row("Audio (s)", f"{audio:.1f}")
+    table.add_row("Decoder CPU (s)", f"{cpu:.1f}")
+    table.add_row("Real-time factor (CPU)", f"{cpu / audio:.3f}" if audio else "n/a")
+    table.add_row("Wall time (s)", f"{wall_seconds:.1f} on {workers} workers")
+    table.add_row("Throughput (audio s / wall s)", f"{audio / wall_seconds:.1f}" if wall_seconds else "n/a")
+    if checked:
+        matched = sum(r["plan_match"] for r in checked)
+        table.add_row("Plan accuracy", f"{matched}/{len(checked)} ({matched / len(checked) * 100:.1f}%)")
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcribe WAV files through Vosk and the command classifier.")
+    parser.add_argument('wavs', nargs='+', help="16 kHz mono WAV files or directories of them")
+    parser.add_argument('--output', default='transcripts.jsonl')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--vosk-model', default=default_model_path)
+    parser.add_argument('--model', default='voice_command_model.pkl')
+    parser.add_argument('--grammar', action='store_true',
+                        help="constrain Vosk to the command vocabulary (needs a small, grammar-capable model)")
+    parser.add_argument('--split', action='store_true',
+                        help="split long recordings into utterances with the VAD")
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--vad-energy-threshold', type=float, default=300.0)
+    parser.add_argument('--vad-zcr-threshold', type=float, default=0.3)
+    parser.add_argument('--vad-hangover-frames', type=int, default=4)
+    parser.add_argument('--vad-preroll-frames', type=int, default=2)
+    args = parser.parse_args()
+
+    wavs = collect_wavs(args.wavs)
+    if not wavs:
+        console.print("[bold red]No WAV files found.[/bold red]")
+        return
+    if not os.path.exists(args.vosk_model):
+        console.print(f"[bold red]Vosk model directory not found: {args.vosk_model}[/bold red]")
+        return
+    if args.grammar and not supports_grammar(args.vosk_model):
+        console.print(f"[bold yellow]{os.path.basename(os.path.normpath(args.vosk_model))} has a static graph, "
+                      f"so --grammar has no effect; use a small model such as "
+                      f"vosk-model-small-en-in-0.4.[/bold yellow]")
+        args.grammar = False
+
+    vad_settings = (args.vad_energy_threshold, args.vad_zcr_threshold,
+                    args.vad_hangover_frames, args.vad_preroll_frames)
+    workers = max(1, min(args.workers, len(wavs)))
+    console.print(f"[bold blue]Transcribing {len(wavs)} files on {workers} workers...[/bold blue]")
+
+    records = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(args.vosk_model, args.model, args.grammar, args.split,
+                                       args.min_confidence, vad_settings)) as executor, \
+            open(args.output, 'w') as out:
+        chunksize = max(1, len(wavs) // (workers * 8))
+        for file_records in executor.map(transcribe_file, wavs, chunksize=chunksize):
+            for record in file_records:
+                out.write(json.dumps(record) + "\n")
+            records.extend(file_records)
+    wall_seconds = time.perf_counter() - started
+
+    print_summary(records, wall_seconds, workers)
+    console.print(f"[bold green]Wrote {len(records)} records to {args.output}[/bold green]")
+
+
+if __name__ == "__main__":
+    main()
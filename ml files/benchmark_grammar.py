@@ -0,0 +1,68 @@
+import sys
+import time
+import wave
+from rich.console import Console
+from rich.table import Table
+from car_engine.vosk_frontend import build_grammar, create_recognizer, default_model_path, load_vosk_model, supports_grammar
+from car_engine.wav_frontend import collect_wavs
+
+console = Console()
+
+chunk_frames = 4000
+
+
+def decode_file(vosk_model, path, grammar=None):
+    with wave.open(path, 'rb') as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path} must be 16-bit mono PCM")
+        rate = wf.getframerate()
+        duration = wf.getnframes() / rate
+        recognizer = create_recognizer(vosk_model, rate, grammar)
+
+        start = time.process_time()
+        while True:
+            data = wf.readframes(chunk_frames)
+            if len(data) == 0:
+                break
+            recognizer.AcceptWaveform(data)
+        recognizer.FinalResult()
+        elapsed = time.process_time() - start
+    return elapsed, duration
+
+
+def main():
+    wavs = collect_wavs(sys.argv[1:])
+    if not wavs:
+        console.print("[bold red]Usage: python benchmark_grammar.py <wav or directory>...[/bold red]")
+        return
+
+    if not supports_grammar(default_model_path):
+        console.print("[bold red]The Vosk model has a static graph and ignores grammars; "
+                      "benchmark with a small model such as vosk-model-small-en-in-0.4.[/bold red]")
+        return
+
+    vosk_model = load_vosk_model()
+    grammar = build_grammar()
+    totals = {"full vocabulary": [0.0, 0.0], "grammar": [0.0, 0.0]}
+    for path in wavs:
+        for name, g in (("full vocabulary", None), ("grammar", grammar)):
+            elapsed, duration = decode_file(vosk_model, path, g)
+            totals[name][0] += elapsed
+            totals[name][1] += duration
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Decoder")
+    table.add_column("CPU time (s)")
+    table.add_column("Audio (s)")
+    table.add_column("Real-time factor")
+    for name, (elapsed, duration) in totals.items():
+        table.add_row(name, f"{elapsed:.2f}", f"{duration:.2f}", f"{elapsed / duration:.3f}")
+    console.print(table)
+
+    full_rtf = totals["full vocabulary"][0] / totals["full vocabulary"][1]
+    grammar_rtf = totals["grammar"][0] / totals["grammar"][1]
+    console.print(f"[bold green]Grammar decoding is {full_rtf / grammar_rtf:.1f}x faster over {len(wavs)} files[/bold green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+default_baseline = 'benchmark_baseline.json'
+default_fixtures = os.path.join('fixtures', 'wavs')
+
+# Metrics that are noisy by nature get a wider gate than --threshold.
+metric_thresholds = {
+    "model_load.pickle_ms": 0.5,
+    "model_load.classifier_ms": 0.5,
+    "serial.frames_per_s": 0.3,
+    "serial.echo_p50_ms": 0.5,
+}
+
+chained_utterances = [
+    "move forward 20 cm and turn left 90 degrees",
+    "go back fifty centimeters and turn right and switch on the headlight",
+    "forward 10 and left 45 and forward 10 and right 45 and headlight off",
+]
+
+
+class Skip(Exception):
+    pass
+
+
+# Like timeit, the collector is paused so a stray collection cannot land in a sample.
+def best_of(fn, repeat=5, number=1):
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - started) / number)
+    finally:
+        gc.enable()
+    return best
+
+
+# Short voiced, speech-like clips (a glottal pulse train through two moving
+# formants, with pauses) so the Vosk case has audio to decode on any machine.
+# Recorded utterances can be dropped into the same directory.
+def write_fixtures(directory, count=3, rate=16000, seed=22):
+    import numpy as np
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for index in range(count):
+        samples = []
+        for _ in range(rng.integers(3, 6)):
+            length = int(rate * rng.uniform(0.15, 0.35))
+            t = np.arange(length) / rate
+            pitch = rng.uniform(100, 180)
+            source = np.sign(np.sin(2 * np.pi * pitch * t)) * 0.3 + rng.normal(0, 0.05, length)
+            formants = sum(np.sin(2 * np.pi * np.linspace(rng.uniform(300, 900), rng.uniform(800, 2500), length) * t)
+                           for _ in range(2))
+            envelope = np.hanning(length)
+            samples += [source * formants * envelope, np.zeros(int(rate * rng.uniform(0.05, 0.15)))]
+        audio = np.concatenate([np.zeros(rate // 5)] + samples + [np.zeros(rate // 5)])
+        pcm = (audio / np.abs(audio).max() * 12000).astype('<i2')
+        with wave.open(os.path.join(directory, f"synthetic_{index}.wav"), 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(rate)
+            wf.writeframes(pcm.tobytes())
+
+
+def load_pipeline(args):
+    if not os.path.exists(args.model):
+        raise Skip(f"{args.model} not found")
+    import joblib
+    return joblib.load(args.model)
+
+
+def measure_load(model_path):
+    import joblib
+    from car_engine.linear_model import load_classifier
+    load_classifier(model_path)
+    return (best_of(lambda: joblib.load(model_path), repeat=10) * 1000,
+            best_of(lambda: load_classifier(model_path), repeat=10) * 1000)
+
+
+# Load time differs by up to 2x from one interpreter to the next, so each
+# sample comes from a fresh process and the best of them is reported.
+def bench_model_load(args):
+    load_pipeline(args)
+    samples = []
+    for _ in range(args.load_processes):
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            samples.append(executor.submit(measure_load, args.model).result())
+    pickle_ms, classifier_ms = zip(*samples)
+    return {
+        "model_load.pickle_ms": (min(pickle_ms), "ms", "lower"),
+        "model_load.classifier_ms": (min(classifier_ms), "ms", "lower"),
+    }
+
+
+def bench_predict(args):
+    from car_engine.linear_model import load_classifier, classify_many
+    from dataset import build_dataset
+    load_pipeline(args)
+    classifier = load_classifier(args.model)
+    texts = build_dataset()['command'].tolist()[:args.batch_size]
+    single = best_of(lambda: [classify_many(classifier, [text]) for text in texts], repeat=10) / len(texts)
+    batched = best_of(lambda: classify_many(classifier, texts), repeat=10)
+    return {
+        "predict.single_us": (single * 1e6, "us", "lower"),
+        "predict.batched_us_per_text": (batched / len(texts) * 1e6, "us", "lower"),
+    }
+
+
+def bench_extract(args):
+    from car_engine.quantities import parse
+    from dataset import build_dataset
+    corpus = build_dataset()['command'].tolist()
+    corpus = (corpus * (args.corpus_size // len(corpus) + 1))[:args.corpus_size]
+
+    def run():
+        for text in corpus:
+            parse(text)
+    return {"extract.transcripts_per_s": (len(corpus) / best_of(run, repeat=5), "1/s", "higher")}
+
+
+def bench_process_command(args):
+    from car_engine import console as engine_console
+    from car_engine.core import CommandEngine
+    from car_engine.quantities import parse
+    from car_engine.transports import SimulatorTransport
+    load_pipeline(args)
+    engine_console.use_plain_output()
+    engine = CommandEngine(SimulatorTransport(verbose=False), model_path=args.model)
+    engine.load_model()
+
+    def run():
+        for text in chained_utterances:
+            engine.process_command(text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = best_of(run, repeat=10, number=20)
+    clauses = sum(len(parse(text)) for text in chained_utterances)
+    return {"process_command.us_per_clause": (elapsed / clauses * 1e6, "us", "lower")}
+
+
+def bench_vosk_rtf(args):
+    from car_engine.vosk_frontend import default_model_path, load_vosk_model, create_recognizer
+    from car_engine.wav_frontend import collect_wavs
+    if not os.path.isdir(args.wavs):
+        raise Skip(f"no WAV fixtures in {args.wavs}")
+    if not os.path.exists(default_model_path):
+        raise Skip("Vosk model directory not found")
+    wavs = collect_wavs([args.wavs])
+    if not wavs:
+        raise Skip(f"no WAV fixtures in {args.wavs}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        vosk_model = load_vosk_model()
+
+    cpu = 0.0
+    audio = 0.0
+    for path in wavs:
+        with wave.open(path, 'rb') as wf:
+            recognizer = create_recognizer(vosk_model, wf.getframerate())
+            audio += wf.getnframes() / wf.getframerate()
+            data = wf.readframes(wf.getnframes())
+        started = time.process_time()
+        for offset in range(0, len(data), 8000):
+            recognizer.AcceptWaveform(data[offset:offset + 8000])
+        recognizer.FinalResult()
+        cpu += time.process_time() - started
+    return {"vosk.rtf": (cpu / audio, "x", "lower")}
+
+
+def bench_serial(args):
+    from car_engine import console as engine_console
+    from car_engine.transports import SerialTransport
+    engine_console.use_plain_output()
+    frames = args.serial_frames
+    transport = SerialTransport('loop://', 115200, attempts=1, retry_delay=0, history=frames)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if not transport.connect():
+            raise Skip("could not open loop://")
+        started = time.perf_counter()
+        deadline = started + 10
+        # Keep the window of unacknowledged frames inside the transport's echo queue.
+        for sent in range(0, frames, 32):
+            window = min(32, frames - sent)
+            for _ in range(window):
+                transport.send_motion("1", 0.5)
+            while len(transport.round_trips) < sent + window and time.perf_counter() < deadline:
+                time.sleep(0.0005)
+        elapsed = time.perf_counter() - started
+        round_trips = sorted(transport.round_trips)
+        transport.close()
+    if len(round_trips) < frames:
+        raise Skip(f"only {len(round_trips)} of {frames} frames echoed")
+    return {
+        "serial.frames_per_s": (frames / elapsed, "1/s", "higher"),
+        "serial.echo_p50_ms": (round_trips[len(round_trips) // 2], "ms", "lower"),
+    }
+
+
+cases = {
+    "model_load": bench_model_load,
+    "predict": bench_predict,
+    "extract": bench_extract,
+    "process_command": bench_process_command,
+    "vosk_rtf": bench_vosk_rtf,
+    "serial": bench_serial,
+}
+
+
+def regression(value, reference, better):
+    if better == "lower":
+        return value / reference - 1
+    return reference / value - 1
+
+
+def regressed(results, baseline, threshold):
+    return [name for name, (value, _, better) in results.items()
+            if name in baseline and
+            regression(value, baseline[name]["value"], better) > max(threshold, metric_thresholds.get(name, 0))]
+
+
+def run_case(name, args, results, owners):
+    try:
+        measured = cases[name](args)
+    except Skip as e:
+        console.print(f"[bold yellow]Skipped {name}: {e}[/bold yellow]")
+        return
+    for metric, (value, unit, better) in measured.items():
+        owners[metric] = name
+        if metric in results:
+            pick = min if better == "lower" else max
+            value = pick(value, results[metric][0])
+        results[metric] = (value, unit, better)
+
+
+def compare(results, baseline, threshold, failures):
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_column("Baseline", justify="right")
+    table.add_column("Worse by", justify="right")
+    table.add_column("Status")
+    for name, (value, unit, better) in results.items():
+        reference = baseline.get(name, {}).get("value")
+        if reference is None:
+            table.add_row(name, f"{value:.3f} {unit}", "-", "-", "[dim]new[/dim]")
+            continue
+        change = regression(value, reference, better)
+        if name in failures:
+            status = "[bold red]regressed[/bold red]"
+        elif change < -threshold:
+            status = "[bold green]faster[/bold green]"
+        else:
+            status = "ok"
+        table.add_row(name, f"{value:.3f} {unit}", f"{reference:.3f} {unit}", f"{change * 100:+.1f}%", status)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voice command pipeline against a stored baseline.")
+    parser.add_argument('--cases', nargs='+', choices=sorted(cases), default=list(cases))
+    parser.add_argument('--model', default='voice_command_model.pkl')
+    parser.add_argument('--wavs', default=default_fixtures, help="directory of WAV fixtures for the Vosk case")
+    parser.add_argument('--baseline', default=default_baseline)
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="fail when a metric is this fraction worse than the baseline")
+    parser.add_argument('--confirm', type=int, default=2,
+                        help="re-run a regressed case this many times before failing, keeping its best values")
+    parser.add_argument('--output', help="also write the results to this JSON file")
+    parser.add_argument('--write-fixtures', action='store_true',
+                        help="regenerate the synthetic WAV fixtures in --wavs and exit")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--load-processes', type=int, default=9,
+                        help="fresh interpreters to time model loading in")
+    parser.add_argument('--corpus-size', type=int, default=100000)
+    parser.add_argument('--serial-frames', type=int, default=500)
+    args = parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures(args.wavs)
+        console.print(f"[bold green]Wrote fixtures to {args.wavs}[/bold green]")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["metrics"]
+    elif not args.save_baseline:
+        # Baselines are machine-specific and not committed; without one the gate would pass vacuously.
+        console.print(f"[bold red]No baseline at {args.baseline}; record one on this machine with "
+                      f"--save-baseline first.[/bold red]")
+        raise SystemExit(1)
+
+    results = {}
+    owners = {}
+    for name in args.cases:
+        console.print(f"[bold blue]Running {name}...[/bold blue]")
+        run_case(name, args, results, owners)
+
+    # A busy machine can slow one case down for a while; a real regression survives a re-run.
+    failures = regressed(results, baseline, args.threshold)
+    for _ in range(args.confirm if not args.save_baseline else 0):
+        if not failures:
+            break
+        for name in sorted({owners[metric] for metric in failures}):
+            console.print(f"[bold blue]Re-running {name} to confirm a regression...[/bold blue]")
+            run_case(name, args, results, owners)
+        failures = regressed(results, baseline, args.threshold)
+    compare(results, baseline, args.threshold, failures)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "metrics": {name: {"value": value, "unit": unit, "better": better}
+                    for name, (value, unit, better) in results.items()},
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        report["metrics"] = {**baseline, **report["metrics"]}
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        console.print(f"[bold green]Baseline saved to {args.baseline}[/bold green]")
+        return
+
+    if failures:
+        console.print(f"[bold red]{len(failures)} metrics regressed by more than "
+                      f"{args.threshold * 100:.0f}%: {', '.join(failures)}[/bold red]")
+        raise SystemExit(1)
+    console.print("[bold green]No regressions.[/bold green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .core import CommandEngine, EarlyCommitter, command_mapping, number_words
+from .frontends import frontends, load_frontend
+from .transports import SerialTransport, SimulatorTransport, transports
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import deque
+
+from .console import report
+
+sample_rate = 16000
+frames_per_buffer = 4096
+ring_buffer_frames = 64
+
+
+class AudioCapture:
+    def __init__(self, rate=sample_rate, chunk=frames_per_buffer, max_frames=ring_buffer_frames):
+        self.rate = rate
+        self.chunk = chunk
+        self.buffer = deque(maxlen=max_frames)
+        self.dropped_frames = 0
+        self._ready = threading.Condition()
+        self._running = False
+        self._audio = None
+        self._stream = None
+        self._thread = None
+
+    def start(self):
+        import pyaudio
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16, channels=1,
+                                        rate=self.rate, input=True, frames_per_buffer=self.chunk)
+        self._stream.start_stream()
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        while self._running:
+            try:
+                data = self._stream.read(self.chunk, exception_on_overflow=False)
+            except OSError as e:
+                report(f"Audio read error: {e}", style="bold red")
+                continue
+            with self._ready:
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped_frames += 1
+                self.buffer.append((time.monotonic(), data))
+                self._ready.notify()
+
+    def frames(self):
+        while self._running:
+            with self._ready:
+                while not self.buffer and self._running:
+                    self._ready.wait(0.5)
+                if not self.buffer:
+                    continue
+                frame = self.buffer.popleft()
+            yield frame
+
+    def stop(self):
+        self._running = False
+        with self._ready:
+            self._ready.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._audio is not None:
+            self._audio.terminate()
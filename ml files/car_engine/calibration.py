@@ -0,0 +1,268 @@
+import json
+import math
+import os
+import time
+
+from .console import report
+
+PROFILE_VERSION = 2
+default_profile_path = 'calibration_profile.json'
+
+directions = {
+    "forward": "cm",
+    "backward": "cm",
+    "left": "deg",
+    "right": "deg",
+}
+
+# Speeds implied by the original delay factors (22 ms per cm, 9 ms per degree).
+default_speeds = {
+    "forward": 1000 / 22,
+    "backward": 1000 / 22,
+    "left": 1000 / 9,
+    "right": 1000 / 9,
+}
+
+regressors = ("session_minutes", "voltage")
+
+# Prior spread of the slope, as a fraction of the starting speed per unit of
+# the regressor. It keeps the slope near zero until measurements actually
+# span a range of session time or voltage.
+slope_prior = 0.002
+
+
+class SpeedModel:
+    # speed = intercept + slope * x, fitted by recursive least squares with
+    # forgetting so the newest measurements of a draining battery dominate.
+    # The line is only trusted over the range of x it was fitted on.
+    def __init__(self, intercept, slope=0.0, covariance=None, samples=0, forgetting=0.98,
+                 floor=None, x_range=None):
+        self.theta = [intercept, slope]
+        self.covariance = covariance or [[intercept * intercept, 0.0],
+                                         [0.0, (slope_prior * intercept) ** 2]]
+        self.samples = samples
+        self.forgetting = forgetting
+        self.floor = intercept * 0.1 if floor is None else floor
+        self.x_range = x_range
+
+    def speed(self, x):
+        if self.x_range is not None:
+            x = min(max(x, self.x_range[0]), self.x_range[1])
+        return max(self.theta[0] + self.theta[1] * x, self.floor)
+
+    def update(self, x, measured_speed):
+        phi = (1.0, x)
+        P = self.covariance
+        P_phi = [P[0][0] * phi[0] + P[0][1] * phi[1], P[1][0] * phi[0] + P[1][1] * phi[1]]
+        denominator = self.forgetting + phi[0] * P_phi[0] + phi[1] * P_phi[1]
+        gain = [P_phi[0] / denominator, P_phi[1] / denominator]
+        error = measured_speed - (self.theta[0] + self.theta[1] * x)
+        self.theta = [self.theta[0] + gain[0] * error, self.theta[1] + gain[1] * error]
+        self.covariance = [[(P[i][j] - gain[i] * P_phi[j]) / self.forgetting for j in range(2)]
+                           for i in range(2)]
+        self.samples += 1
+        low, high = self.x_range or (x, x)
+        self.x_range = [min(low, x), max(high, x)]
+        return error
+
+    def to_dict(self):
+        return {"theta": self.theta, "covariance": self.covariance, "samples": self.samples,
+                "floor": self.floor, "x_range": self.x_range}
+
+    @classmethod
+    def from_dict(cls, data, forgetting):
+        intercept, slope = data["theta"]
+        return cls(intercept, slope, data["covariance"], data.get("samples", 0), forgetting,
+                   data["floor"], data.get("x_range"))
+
+
+class CalibrationProfile:
+    def __init__(self, regressor="session_minutes", forgetting=0.98, models=None, path=None):
+        if regressor not in regressors:
+            raise ValueError(f"Unknown regressor '{regressor}', expected one of {', '.join(regressors)}")
+        self.regressor = regressor
+        self.forgetting = forgetting
+        self.models = models or {direction: SpeedModel(speed, forgetting=forgetting)
+                                 for direction, speed in default_speeds.items()}
+        self.path = path
+        self.voltage = None
+        self.last_voltage = None
+        self.session_started = time.monotonic()
+
+    @classmethod
+    def load(cls, path=default_profile_path):
+        if not os.path.exists(path):
+            return cls(path=path)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") != PROFILE_VERSION:
+                raise ValueError(f"profile version {data.get('version')}, expected {PROFILE_VERSION}")
+            forgetting = data.get("forgetting", 0.98)
+            models = {direction: SpeedModel.from_dict(data["directions"][direction], forgetting)
+                      for direction in directions}
+            profile = cls(data.get("regressor", "session_minutes"), forgetting, models, path)
+            profile.last_voltage = data.get("last_voltage")
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            report(f"Ignoring calibration profile {path}: {e}", style="bold yellow")
+            return cls(path=path)
+        report(f"Loaded calibration profile {path} ({profile.samples} samples).", style="dim")
+        return profile
+
+    def save(self, path=None):
+        path = path or self.path or default_profile_path
+        data = {
+            "version": PROFILE_VERSION,
+            "regressor": self.regressor,
+            "forgetting": self.forgetting,
+            "last_voltage": self.voltage if self.voltage is not None else self.last_voltage,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "directions": {direction: model.to_dict() for direction, model in self.models.items()},
+        }
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temporary, path)
+        self.path = path
+
+    @property
+    def samples(self):
+        return sum(model.samples for model in self.models.values())
+
+    def start_session(self, voltage=None):
+        self.session_started = time.monotonic()
+        self.voltage = voltage
+        if self.regressor == "voltage" and voltage is None and self.last_voltage is not None:
+            report(f"No battery voltage given, assuming the last measured {self.last_voltage:.2f} V.",
+                   style="bold yellow")
+
+    def missing_voltage(self, voltage=None):
+        return self.regressor == "voltage" and voltage is None and self.last_voltage is None
+
+    def regressor_value(self):
+        if self.regressor == "voltage":
+            voltage = self.voltage if self.voltage is not None else self.last_voltage
+            if voltage is None:
+                raise ValueError("this profile is fitted against battery voltage; pass --battery-voltage")
+            return voltage
+        return (time.monotonic() - self.session_started) / 60
+
+    def speed(self, direction):
+        return self.models[direction].speed(self.regressor_value())
+
+    def seconds_per_unit(self, direction):
+        return 1 / self.speed(direction)
+
+    def delay(self, direction, amount):
+        return amount / self.speed(direction)
+
+    def observe(self, direction, measured, duration, x=None):
+        if duration <= 0 or measured < 0:
+            return None
+        x = self.regressor_value() if x is None else x
+        return self.models[direction].update(x, measured / duration)
+
+    def status(self):
+        return ", ".join(f"{direction} {self.speed(direction):.1f} {unit}/s"
+                         for direction, unit in directions.items())
+
+
+def measure_from_simulator(transport, pose_before):
+    firmware = transport.firmware
+    x, y, heading = pose_before
+    distance = math.hypot(firmware.x - x, firmware.y - y)
+    turned = (firmware.heading - heading) % 360
+    return distance, min(turned, 360 - turned)
+
+
+def ask_measurement(direction, nominal):
+    unit = directions[direction]
+    answer = input(f"Measured {direction} travel in {unit} (commanded {nominal:g}, Enter to skip): ").strip()
+    try:
+        return float(answer) if answer else None
+    except ValueError:
+        report(f"'{answer}' is not a number, skipping this move.", style="bold red")
+        return None
+
+
+def run_calibration(transport, profile, moves, repeat=1, settle=0.5):
+    from .core import command_mapping
+    simulated = hasattr(transport, "firmware")
+    for round_index in range(repeat):
+        for direction, amount in moves:
+            duration = profile.delay(direction, amount)
+            x = profile.regressor_value()
+            pose = None
+            if simulated:
+                firmware = transport.firmware
+                pose = (firmware.x, firmware.y, firmware.heading)
+            report(f"Round {round_index + 1}: {direction} {amount:g} {directions[direction]} "
+                   f"for {duration:.2f} s", style="bold blue")
+            transport.send_motion(command_mapping[direction], duration)
+            time.sleep(duration)
+            if transport.needs_host_stop:
+                transport.send_stop()
+            time.sleep(settle)
+
+            if simulated:
+                distance, angle = measure_from_simulator(transport, pose)
+                measured = distance if directions[direction] == "cm" else angle
+            else:
+                measured = ask_measurement(direction, amount)
+            if measured is None:
+                continue
+            error = profile.observe(direction, measured, duration, x)
+            report(f"Measured {measured:.1f} {directions[direction]}, speed error {error:+.1f}; "
+                   f"now {profile.speed(direction):.1f} {directions[direction]}/s", style="green")
+    return profile
+
+
+def main():
+    import argparse
+    from .transports import SerialTransport, SimulatorTransport
+    parser = argparse.ArgumentParser(description="Fit per-direction motor speeds from timed test moves.")
+    parser.add_argument('--profile', default=default_profile_path)
+    parser.add_argument('--transport', choices=("serial", "simulator"), default='serial')
+    parser.add_argument('--port', default='COM13')
+    parser.add_argument('--baud-rate', type=int, default=9600)
+    parser.add_argument('--regressor', choices=regressors,
+                        help="what speed is fitted against (only used for a new profile)")
+    parser.add_argument('--battery-voltage', type=float, help="battery voltage measured before this run")
+    parser.add_argument('--distance', type=float, default=30, help="test distance in cm")
+    parser.add_argument('--angle', type=float, default=90, help="test angle in degrees")
+    parser.add_argument('--repeat', type=int, default=2)
+    parser.add_argument('--sim-speed-scale', type=float, default=1.0,
+                        help="make the simulated motors this much faster or slower")
+    args = parser.parse_args()
+
+    profile = CalibrationProfile.load(args.profile)
+    if args.regressor and profile.samples == 0:
+        profile = CalibrationProfile(args.regressor, path=args.profile)
+    # A stale voltage would be fitted as if it were current, so calibration always needs a fresh one.
+    if profile.regressor == "voltage" and args.battery_voltage is None:
+        parser.error("this profile is fitted against battery voltage; pass --battery-voltage")
+    profile.start_session(args.battery_voltage)
+
+    if args.transport == 'simulator':
+        transport = SimulatorTransport(baud_rate=args.baud_rate, verbose=False)
+        transport.firmware.speed *= args.sim_speed_scale
+        transport.firmware.turn_rate *= args.sim_speed_scale
+    else:
+        transport = SerialTransport(args.port, args.baud_rate)
+    if not transport.connect():
+        return
+
+    moves = [("forward", args.distance), ("backward", args.distance),
+             ("left", args.angle), ("right", args.angle)]
+    try:
+        run_calibration(transport, profile, moves, args.repeat)
+    except KeyboardInterrupt:
+        report("Calibration interrupted, saving what was measured.", style="bold yellow")
+    finally:
+        transport.close()
+    profile.save(args.profile)
+    report(f"Saved {args.profile}: {profile.status()}", style="bold green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import console
+from . import tracing
+from .console import report
+from .core import CommandEngine, EarlyCommitter
+from .frontends import frontends, load_frontend
+from .startup import timed_stage, print_startup_profile
+from .transports import SerialTransport, SimulatorTransport, transports
+
+
+def display_welcome_message():
+    pattern = '''
+***********************
+*  Welcome to Robot   *
+***********************
+    '''
+    if console.plain_output:
+        print(pattern)
+        return
+    from rich.panel import Panel
+    console.get_console().print(Panel.fit(
+        pattern, title="[bold cyan]Welcome[/bold cyan]", border_style="green", width=40))
+
+
+def build_parser(default_frontend):
+    parser = argparse.ArgumentParser(description="Voice control for the robot car.")
+    parser.add_argument('--frontend', choices=sorted(frontends), default=default_frontend)
+    parser.add_argument('--transport', choices=sorted(transports), default='serial')
+    parser.add_argument('--port', default='COM13', help="serial port or pyserial URL")
+    parser.add_argument('--baud-rate', type=int, default=9600)
+    parser.add_argument('--sim-latency', type=float, default=0.0,
+                        help="one-way link latency in ms for the simulator transport")
+    parser.add_argument('--model', default='voice_command_model.pkl')
+    parser.add_argument('--calibration', default='calibration_profile.json',
+                        help="motor speed profile written by python -m car_engine.calibration")
+    parser.add_argument('--battery-voltage', type=float,
+                        help="battery voltage, for profiles fitted against voltage")
+    parser.add_argument('--grammar', action='store_true',
+                        help="constrain Vosk to the command vocabulary (needs a small, grammar-capable model)")
+    parser.add_argument('--early-commit', action='store_true',
+                        help="act on stable Vosk partial results")
+    parser.add_argument('--stability-frames', type=int, default=3)
+    parser.add_argument('--early-commit-confidence', type=float, default=0.85)
+    parser.add_argument('--no-plan-optimizer', action='store_true',
+                        help="send every parsed command as-is instead of fusing and cancelling moves")
+    parser.add_argument('--no-vad', action='store_true', help="feed every frame to Vosk")
+    parser.add_argument('--vad-energy-threshold', type=float, default=300.0,
+                        help="RMS energy above which a frame counts as speech")
+    parser.add_argument('--vad-zcr-threshold', type=float, default=0.3,
+                        help="zero-crossing rate that lets a half-energy frame count as speech (fricatives)")
+    parser.add_argument('--vad-hangover-frames', type=int, default=4,
+                        help="quiet frames still fed to Vosk after speech")
+    parser.add_argument('--vad-preroll-frames', type=int, default=2,
+                        help="frames kept from before speech onset")
+    parser.add_argument('--no-local-fallback', action='store_true',
+                        help="do not race the cloud recognizer against Vosk")
+    parser.add_argument('--plain', action='store_true', help="print plain text instead of rich output")
+    parser.add_argument('--trace', action='store_true',
+                        help="time every utterance stage and show a live latency panel")
+    parser.add_argument('--trace-jsonl', help="append trace events to this JSONL file (implies --trace)")
+    parser.add_argument('--trace-prometheus',
+                        help="keep a Prometheus textfile of stage latencies here (implies --trace)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print an import/load time breakdown and exit")
+    parser.add_argument('wavs', nargs='*', help="WAV files or directories for the wav front-end")
+    return parser
+
+
+def create_frontend(args):
+    frontend_class = load_frontend(args.frontend)
+    if args.frontend == 'vosk':
+        return frontend_class(use_grammar=args.grammar, partials=args.early_commit,
+                              use_vad=not args.no_vad, vad_energy_threshold=args.vad_energy_threshold,
+                              vad_zcr_threshold=args.vad_zcr_threshold,
+                              vad_hangover_frames=args.vad_hangover_frames,
+                              vad_preroll_frames=args.vad_preroll_frames)
+    if args.frontend == 'speech_recognition':
+        return frontend_class(local_fallback=not args.no_local_fallback)
+    return frontend_class(args.wavs, use_grammar=args.grammar)
+
+
+def create_transport(args):
+    if args.transport == 'serial':
+        return SerialTransport(args.port, args.baud_rate)
+    return SimulatorTransport(baud_rate=args.baud_rate, latency=args.sim_latency / 1000)
+
+
+def bootstrap(frontend, engine, transport):
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+    stages = {
+        "frontend": executor.submit(timed_stage, f"{frontend.name} front-end", frontend.load),
+        "classifier": executor.submit(timed_stage, "Command classifier", engine.load_model),
+        "transport": executor.submit(timed_stage, "Transport", transport.connect),
+    }
+    executor.shutdown(wait=False)
+    return stages
+
+
+def stop_requested(frontend):
+    if not frontend.live:
+        return False
+    import keyboard
+    return keyboard.is_pressed('o')
+
+
+def wait_until_idle(engine, poll=0.05):
+    while engine.scheduler.queue_depth:
+        time.sleep(poll)
+
+
+def start_latency_panel(tracer):
+    if tracer is None or console.plain_output:
+        return None
+    from rich.live import Live
+    live = Live(get_renderable=tracer.render, console=console.get_console(), refresh_per_second=2)
+    live.start()
+    return live
+
+
+def stop_latency_panel(live, tracer):
+    if tracer is None:
+        return
+    if live is not None:
+        live.stop()
+    else:
+        for line in tracer.summary_lines():
+            report(line)
+    tracing.disable()
+
+
+def run(default_frontend='vosk', argv=None):
+    parser = build_parser(default_frontend)
+    args = parser.parse_args(argv)
+    if args.plain:
+        console.use_plain_output()
+
+    frontend = create_frontend(args)
+    transport = create_transport(args)
+    engine = CommandEngine(transport, model_path=args.model, optimize_plans=not args.no_plan_optimizer,
+                           calibration_path=args.calibration)
+    if engine.calibration.missing_voltage(args.battery_voltage):
+        parser.error(f"{args.calibration} is fitted against battery voltage; pass --battery-voltage")
+
+    display_welcome_message()
+
+    stages = bootstrap(frontend, engine, transport)
+    try:
+        stages["frontend"].result()
+    except FileNotFoundError as e:
+        report(str(e), style="bold red")
+        return
+
+    if args.profile_startup:
+        stages["classifier"].result()
+        stages["transport"].result()
+        print_startup_profile()
+        transport.close()
+        return
+
+    committer = None
+    if args.early_commit:
+        committer = EarlyCommitter(engine, args.stability_frames, args.early_commit_confidence)
+    tracer = None
+    if args.trace or args.trace_jsonl or args.trace_prometheus:
+        tracer = tracing.enable(jsonl_path=args.trace_jsonl, prometheus_path=args.trace_prometheus)
+    live = start_latency_panel(tracer)
+    frontend.start()
+    engine_started = False
+    try:
+        for text, final, timestamp in frontend.transcripts():
+            if stop_requested(frontend):
+                report("Program terminated by user.", style="bold red")
+                break
+
+            stages["classifier"].result()
+            if not engine_started:
+                if not stages["transport"].result():
+                    break
+                engine.start(args.battery_voltage)
+                engine_started = True
+
+            if not final:
+                commands = committer.observe_partial(text, timestamp)
+                if commands:
+                    engine.dispatch(text, commands)
+            elif committer is not None and committer.committed is not None:
+                commands = engine.resolve_command(text, optimize=False) if text is not None else []
+                remainder, preempt = committer.reconcile(commands, timestamp)
+                engine.scheduler.submit(engine.optimize_plan(remainder), preempt=preempt,
+                                        trace=tracing.current())
+            else:
+                # Every final closes the utterance, so partial stability never carries over.
+                if committer is not None:
+                    committer.reset()
+                if text is not None:
+                    engine.dispatch(text, engine.resolve_command(text))
+
+        if engine_started and not frontend.live:
+            wait_until_idle(engine)
+    finally:
+        engine.shutdown()
+        frontend.stop()
+        stop_latency_panel(live, tracer)
@@ -0,0 +1,25 @@
+import sys
+
+plain_output = False
+_console = None
+
+
+def use_plain_output(enabled=True):
+    global plain_output
+    plain_output = enabled
+
+
+def get_console():
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+
+def report(message, style=None):
+    if plain_output:
+        print(message, file=sys.stdout, flush=True)
+        return
+    from rich.text import Text
+    get_console().print(Text(message, style=style))
@@ -0,0 +1,241 @@
+from .calibration import CalibrationProfile, default_profile_path
+from .console import report
+from .linear_model import load_classifier, classify_many
+from .motion_scheduler import MotionScheduler
+from .plan_cache import PlanCache
+from . import plan_optimizer
+from .quantities import parse, small_numbers, tens, distance_cm, angle_degrees
+from . import tracing
+
+forward_backward_delay_factor = 22 / 1000
+left_right_delay_factor = 9 / 1000
+
+number_words = {**small_numbers, **tens}
+
+command_mapping = {
+    "forward": "1",
+    "backward": "2",
+    "right": "3",
+    "left": "4",
+    "headlight on": "5",
+    "headlight off": "6"
+}
+
+command_names = {opcode: name for name, opcode in command_mapping.items()}
+
+
+def build_command(action, clause, calibration=None):
+    if action in ["forward", "backward"]:
+        seconds_per_cm = calibration.seconds_per_unit(action) if calibration else forward_backward_delay_factor
+        return (command_mapping[action], distance_cm(clause.quantities, seconds_per_cm))
+    elif action in ["left", "right"]:
+        seconds_per_degree = calibration.seconds_per_unit(action) if calibration else left_right_delay_factor
+        return (command_mapping[action], angle_degrees(clause.quantities, seconds_per_degree))
+    return (command_mapping[action], 0)
+
+
+def motion_delay(command_word, distance, calibration=None):
+    if command_word in ["headlight on", "headlight off"]:
+        return 0
+    if calibration is not None:
+        return calibration.delay(command_word, distance)
+    if command_word in ["left", "right"]:
+        return distance * left_right_delay_factor
+    return distance * forward_backward_delay_factor
+
+
+class CommandEngine:
+    def __init__(self, transport, model_path='voice_command_model.pkl', min_confidence=0.5,
+                 cache_size=256, preempt_on_new_command=True, optimize_plans=True,
+                 calibration_path=default_profile_path):
+        self.transport = transport
+        self.calibration = CalibrationProfile.load(calibration_path)
+        self.optimize_plans = optimize_plans
+        self.model_path = model_path
+        self.model = None
+        self.min_confidence = min_confidence
+        self.preempt_on_new_command = preempt_on_new_command
+        self.plan_cache = PlanCache(max_size=cache_size, model_path=model_path,
+                                    on_model_change=self.reload_model)
+        self.scheduler = MotionScheduler(self.send_command, self.finish_command)
+
+    def load_model(self):
+        self.model = load_classifier(self.model_path)
+        return self.model
+
+    def reload_model(self):
+        if self.model is None:
+            return
+        try:
+            self.load_model()
+            report(f"Reloaded retrained model {self.model_path}.", style="bold cyan")
+        except Exception as e:
+            report(f"Could not reload {self.model_path}, keeping the previous model: {e}", style="bold red")
+
+    def process_command(self, text):
+        commands = []
+        report(f"Processing command: {text}", style="bold yellow")
+        clauses = parse(text)
+        try:
+            predictions = classify_many(self.model, [clause.text for clause in clauses])
+        except Exception as e:
+            report(f"Error in classification: {e}", style="bold red")
+            return commands
+
+        for clause, (action, confidence) in zip(clauses, predictions):
+            if action not in command_mapping:
+                report(f"Command '{clause.text}' not recognized.", style="bold red")
+                continue
+            if confidence is not None and confidence < self.min_confidence:
+                report(f"Command '{clause.text}' rejected: {action} at confidence {confidence:.2f}.",
+                       style="bold red")
+                continue
+
+            slots = ", ".join(f"{q.value:g} {q.unit or ''}".strip() for q in clause.quantities)
+            report(f"Predicted command: {action} ({confidence or 0:.2f})" + (f" [{slots}]" if slots else ""),
+                   style="bold green")
+            commands.append(build_command(action, clause, self.calibration))
+        return commands
+
+    def resolve_command(self, text, optimize=True):
+        commands = self.plan_cache.resolve(text, self.process_command)
+        tracing.mark("classified")
+        report(self.plan_cache.status(), style="dim")
+        return self.optimize_plan(commands) if optimize else commands
+
+    def optimize_plan(self, commands):
+        if not self.optimize_plans or not commands:
+            return commands
+        optimized = plan_optimizer.optimize(commands)
+        if optimized != commands:
+            before = plan_optimizer.estimate(commands, self.motion_delay, command_names)
+            after = plan_optimizer.estimate(optimized, self.motion_delay, command_names)
+            report(f"Plan optimized: {before.commands} -> {after.commands} commands, "
+                   f"est. {before.total_seconds:.2f} s -> {after.total_seconds:.2f} s "
+                   f"(saved {before.total_seconds - after.total_seconds:.2f} s)", style="bold cyan")
+        return optimized
+
+    def plan_partial(self, text):
+        commands = []
+        confidence = 1.0
+        clauses = parse(text)
+        predictions = classify_many(self.model, [clause.text for clause in clauses])
+        for clause, (action, clause_confidence) in zip(clauses, predictions):
+            commands.append(build_command(action, clause, self.calibration))
+            if clause_confidence is not None:
+                confidence = min(confidence, clause_confidence)
+        return commands, confidence
+
+    def motion_delay(self, command_word, distance):
+        return motion_delay(command_word, distance, self.calibration)
+
+    def send_command(self, action, distance):
+        if not self.transport.is_connected:
+            report("Bluetooth connection is not established.", style="bold red")
+            return None
+
+        try:
+            command_word = command_names[action]
+            delay = self.motion_delay(command_word, distance)
+            if delay <= 0 and command_word not in ["headlight on", "headlight off"]:
+                report(f"Skipping zero-length {command_word}.", style="bold yellow")
+                return None
+            self.transport.send_motion(action, delay)
+
+            if command_word in ["left", "right"]:
+                report(f"Successfully sent: {command_word} with degree {distance} deg", style="bold green")
+            elif command_word in ["headlight on", "headlight off"]:
+                report(f"Successfully sent: {command_word}", style="bold green")
+            else:
+                report(f"Successfully sent: {command_word} with distance {distance} cm", style="bold green")
+            return delay
+
+        except Exception as e:
+            report(f"Failed to send command: {e}", style="bold red")
+        return None
+
+    def send_stop_command(self):
+        try:
+            self.transport.send_stop()
+            report("Stop command sent successfully.", style="bold green")
+        except Exception as e:
+            report(f"Failed to send stop command: {e}", style="bold red")
+
+    def finish_command(self, preempted):
+        if preempted or self.transport.needs_host_stop:
+            self.send_stop_command()
+
+    def dispatch(self, text, commands):
+        if text.strip().lower() == "stop":
+            self.scheduler.stop()
+            report("Stopping current motion.", style="bold red")
+            return
+
+        if not commands:
+            return
+        self.scheduler.submit(commands, preempt=self.preempt_on_new_command, trace=tracing.current())
+        report(f"Motion queue depth: {self.scheduler.queue_depth}", style="dim")
+
+    def start(self, battery_voltage=None):
+        self.calibration.start_session(battery_voltage)
+        report(f"Motor speeds: {self.calibration.status()}", style="dim")
+        self.scheduler.start()
+
+    def shutdown(self):
+        self.scheduler.shutdown()
+        self.transport.close()
+
+
+class EarlyCommitter:
+    def __init__(self, engine, window=3, threshold=0.85):
+        self.engine = engine
+        self.window = window
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self.candidate = None
+        self.stable = 0
+        self.committed = None
+        self.committed_at = None
+
+    def observe_partial(self, text, timestamp):
+        if self.committed is not None or not text:
+            return None
+
+        commands, confidence = self.engine.plan_partial(text)
+        if confidence < self.threshold:
+            self.candidate = None
+            self.stable = 0
+            return None
+
+        if commands == self.candidate:
+            self.stable += 1
+        else:
+            self.candidate = commands
+            self.stable = 1
+
+        if self.stable >= self.window:
+            self.committed = commands
+            self.committed_at = timestamp
+            report(f"Early commit on partial '{text}' ({confidence:.2f})", style="bold cyan")
+            return commands
+        return None
+
+    # Returns the commands still to run and whether they must preempt the
+    # early-committed motion, which is the case when the final result disagrees.
+    def reconcile(self, commands, timestamp):
+        committed = self.committed
+        committed_at = self.committed_at
+        self.reset()
+        if committed is None:
+            return commands, False
+
+        saved_ms = (timestamp - committed_at) * 1000
+        if commands[:len(committed)] != committed:
+            report(f"Final result {commands} disagrees with early commit {committed}; "
+                   f"replacing it.", style="bold red")
+            return commands, True
+
+        report(f"Early commit saved {saved_ms:.0f} ms.", style="bold cyan")
+        return commands[len(committed):], False
@@ -0,0 +1,311 @@
+import heapq
+import math
+import os
+import threading
+import time
+
+from .console import report
+from .core import forward_backward_delay_factor, left_right_delay_factor
+from .protocol import checksum, PROTOCOL_VERSION, LEGACY_VERSION
+
+RIGHT_MOTOR_PIN1 = 2
+RIGHT_MOTOR_PIN2 = 3
+LEFT_MOTOR_PIN1 = 4
+LEFT_MOTOR_PIN2 = 5
+BUZZER_PIN = 6
+RIGHT_INDICATOR_PIN = 7
+WHITE_LED_PIN = 8
+LEFT_INDICATOR_PIN = 9
+RED_LED_PIN = 10
+
+pin_names = {
+    RIGHT_MOTOR_PIN1: "right motor 1", RIGHT_MOTOR_PIN2: "right motor 2",
+    LEFT_MOTOR_PIN1: "left motor 1", LEFT_MOTOR_PIN2: "left motor 2",
+    BUZZER_PIN: "buzzer", RIGHT_INDICATOR_PIN: "right indicator",
+    WHITE_LED_PIN: "headlight", LEFT_INDICATOR_PIN: "left indicator", RED_LED_PIN: "reverse light",
+}
+
+# (pin, level) writes made by each motion routine in arduino.ino.
+motion_writes = {
+    "1": [(LEFT_MOTOR_PIN1, 0), (LEFT_MOTOR_PIN2, 1), (RIGHT_MOTOR_PIN1, 1), (RIGHT_MOTOR_PIN2, 0)],
+    "2": [(LEFT_MOTOR_PIN1, 1), (LEFT_MOTOR_PIN2, 0), (RIGHT_MOTOR_PIN1, 0), (RIGHT_MOTOR_PIN2, 1),
+          (RED_LED_PIN, 1), (BUZZER_PIN, 1)],
+    "3": [(RIGHT_MOTOR_PIN1, 1), (RIGHT_MOTOR_PIN2, 0), (LEFT_MOTOR_PIN1, 1), (LEFT_MOTOR_PIN2, 0),
+          (RIGHT_INDICATOR_PIN, 1)],
+    "4": [(RIGHT_MOTOR_PIN1, 0), (RIGHT_MOTOR_PIN2, 1), (LEFT_MOTOR_PIN1, 0), (LEFT_MOTOR_PIN2, 1),
+          (LEFT_INDICATOR_PIN, 1)],
+    "7": [(LEFT_MOTOR_PIN1, 0), (LEFT_MOTOR_PIN2, 1), (RIGHT_MOTOR_PIN1, 0), (RIGHT_MOTOR_PIN2, 0),
+          (LEFT_INDICATOR_PIN, 1)],
+    "8": [(LEFT_MOTOR_PIN1, 0), (LEFT_MOTOR_PIN2, 0), (RIGHT_MOTOR_PIN1, 1), (RIGHT_MOTOR_PIN2, 0),
+          (RIGHT_INDICATOR_PIN, 1)],
+    "9": [(LEFT_MOTOR_PIN1, 0), (LEFT_MOTOR_PIN2, 0), (RIGHT_MOTOR_PIN1, 0), (RIGHT_MOTOR_PIN2, 1),
+          (LEFT_INDICATOR_PIN, 1), (RED_LED_PIN, 1), (BUZZER_PIN, 1)],
+    "10": [(LEFT_MOTOR_PIN1, 1), (LEFT_MOTOR_PIN2, 0), (RIGHT_MOTOR_PIN1, 0), (RIGHT_MOTOR_PIN2, 0),
+           (RIGHT_INDICATOR_PIN, 1), (RED_LED_PIN, 1), (BUZZER_PIN, 1)],
+    "5": [(WHITE_LED_PIN, 1)],
+    "6": [(WHITE_LED_PIN, 0)],
+    "0": [(pin, 0) for pin in (RIGHT_MOTOR_PIN1, RIGHT_MOTOR_PIN2, LEFT_MOTOR_PIN1, LEFT_MOTOR_PIN2,
+                               RED_LED_PIN, BUZZER_PIN, LEFT_INDICATOR_PIN, RIGHT_INDICATOR_PIN)],
+}
+
+legacy_opcodes = {"0", "1", "2", "3", "4", "5", "6"}
+
+
+# Python model of processCommand()/loop() in arduino/arduino.ino. Time is
+# passed in so it can run on the wall clock or a virtual one. Pose is
+# integrated exactly between pin changes: x/y in cm, heading in degrees,
+# counter-clockwise (left) positive.
+class CarFirmware:
+    def __init__(self, protocol_version=PROTOCOL_VERSION, speed=1 / forward_backward_delay_factor,
+                 turn_rate=1 / left_right_delay_factor, now=0.0):
+        self.protocol_version = protocol_version
+        self.speed = speed
+        self.turn_rate = turn_rate
+        self.pins = dict.fromkeys(pin_names, 0)
+        self.motion_active = False
+        self.motion_ends_at = 0.0
+        self.clock = now
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.console_log = []
+        self.commands = 0
+        self.errors = 0
+
+    def wheel_directions(self):
+        left = self.pins[LEFT_MOTOR_PIN2] - self.pins[LEFT_MOTOR_PIN1]
+        right = self.pins[RIGHT_MOTOR_PIN1] - self.pins[RIGHT_MOTOR_PIN2]
+        return left, right
+
+    def _integrate(self, until):
+        dt = until - self.clock
+        if dt <= 0:
+            return
+        self.clock = until
+        left, right = self.wheel_directions()
+        velocity = (left + right) / 2 * self.speed
+        yaw_rate = (left - right) / 2 * self.turn_rate
+        if velocity == 0 and yaw_rate == 0:
+            return
+        start = math.radians(self.heading)
+        turned = math.radians(yaw_rate * dt)
+        if yaw_rate == 0:
+            self.x += velocity * dt * math.cos(start)
+            self.y += velocity * dt * math.sin(start)
+        else:
+            radius = velocity / math.radians(yaw_rate)
+            self.x += radius * (math.sin(start + turned) - math.sin(start))
+            self.y -= radius * (math.cos(start + turned) - math.cos(start))
+        self.heading = (self.heading + yaw_rate * dt) % 360
+
+    def advance(self, now):
+        # loop(): a timed motion stops the moment its duration runs out.
+        if self.motion_active and self.motion_ends_at <= now:
+            self._integrate(self.motion_ends_at)
+            self.motion_active = False
+            self._write(motion_writes["0"])
+        self._integrate(now)
+
+    def _write(self, writes):
+        for pin, level in writes:
+            self.pins[pin] = level
+
+    def run_action(self, action):
+        if self.protocol_version >= PROTOCOL_VERSION:
+            if action not in ("5", "6"):
+                self.motion_active = False
+                self._write(motion_writes["0"])
+        elif action not in legacy_opcodes:
+            return
+        self._write(motion_writes.get(action, []))
+
+    def process_command(self, command, now):
+        now = max(now, self.clock)
+        self.advance(now)
+        command = command.strip()
+        self.console_log.append(command)
+        self.commands += 1
+        if self.protocol_version < PROTOCOL_VERSION:
+            self.run_action(command)
+            return []
+        if command == "V":
+            return [f"V{self.protocol_version}"]
+
+        payload, star, received = command.partition('*')
+        if not star:
+            self.run_action(command)
+            return [command]
+        try:
+            valid = checksum(payload) == f"{int(received, 16) & 0xFF:02X}"
+        except ValueError:
+            valid = False
+        if not valid:
+            self.errors += 1
+            return ["ERR"]
+
+        action, _, value = payload.partition(',')
+        duration = int(value) if value.strip().lstrip('-').isdigit() else 0
+        # A framed motion without a positive duration would never time out, so it stops instead.
+        if duration <= 0 and action not in ("5", "6"):
+            action = "0"
+        self.run_action(action)
+        if duration > 0 and action != "0":
+            self.motion_active = True
+            self.motion_ends_at = now + duration / 1000
+        return [command]
+
+    def lit(self):
+        return [pin_names[pin] for pin in (WHITE_LED_PIN, RED_LED_PIN, BUZZER_PIN,
+                                           LEFT_INDICATOR_PIN, RIGHT_INDICATOR_PIN) if self.pins[pin]]
+
+    def status(self):
+        lit = ", ".join(self.lit()) or "nothing"
+        return (f"Simulated car at x {self.x:.1f} cm, y {self.y:.1f} cm, heading {self.heading:.1f}°; "
+                f"{self.commands} commands, {self.errors} checksum errors; on: {lit}")
+
+
+# Runs a CarFirmware on the wall clock behind the HC-05 link: every byte
+# costs 10 bit times at baud_rate each way (None disables throttling) and
+# every line arrives `latency` seconds late. Replies go to on_reply.
+class FirmwareLink:
+    def __init__(self, firmware, on_reply, baud_rate=9600, latency=0.0, tick=0.001):
+        self.firmware = firmware
+        self.on_reply = on_reply
+        self.baud_rate = baud_rate
+        self.latency = latency
+        self.tick = tick
+        self.events = []
+        self.buffer = b""
+        self.uplink_free_at = 0.0
+        self.downlink_free_at = 0.0
+        self._sequence = 0
+        self._lock = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def _transfer_time(self, size):
+        return 0.0 if not self.baud_rate else size * 10 / self.baud_rate
+
+    def _push(self, at, kind, payload):
+        self._sequence += 1
+        heapq.heappush(self.events, (at, self._sequence, kind, payload))
+        self._lock.notify()
+
+    def start(self):
+        self.firmware.clock = time.monotonic()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def feed(self, data):
+        with self._lock:
+            self.buffer += data
+            while b"\n" in self.buffer:
+                line, self.buffer = self.buffer.split(b"\n", 1)
+                started = max(time.monotonic(), self.uplink_free_at)
+                self.uplink_free_at = started + self._transfer_time(len(line) + 1)
+                self._push(self.uplink_free_at + self.latency, "command", line.decode(errors='ignore'))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._running and (not self.events or self.events[0][0] > time.monotonic()):
+                    self._lock.wait(self.tick if not self.events else
+                                    max(0.0, min(self.tick, self.events[0][0] - time.monotonic())))
+                    self.firmware.advance(time.monotonic())
+                if not self._running:
+                    return
+                at, _, kind, payload = heapq.heappop(self.events)
+                if kind == "reply":
+                    deliver = payload
+                else:
+                    deliver = None
+                    for reply in self.firmware.process_command(payload, at):
+                        data = f"{reply}\r\n".encode()
+                        # The firmware holds replies until nothing is arriving on RX.
+                        started = max(at, self.downlink_free_at, self.uplink_free_at)
+                        self.downlink_free_at = started + self._transfer_time(len(data))
+                        self._push(self.downlink_free_at + self.latency, "reply", data)
+            if deliver is not None:
+                self.on_reply(deliver)
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._lock.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self.firmware.advance(time.monotonic())
+
+
+# Serves a simulated car on a pseudo-terminal, so anything that opens a
+# serial port (SerialTransport, keycontrol.py) can talk to it by path.
+class PtyFirmware:
+    def __init__(self, protocol_version=PROTOCOL_VERSION, baud_rate=9600, latency=0.0):
+        import tty
+        self.firmware = CarFirmware(protocol_version)
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self.link = FirmwareLink(self.firmware, self._reply, baud_rate, latency)
+        self._running = False
+        self._reader = None
+
+    def _reply(self, data):
+        try:
+            os.write(self.master, data)
+        except OSError:
+            pass
+
+    def _read_loop(self):
+        import select
+        while self._running:
+            ready, _, _ = select.select([self.master], [], [], 0.05)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 1024)
+            except OSError:
+                return
+            self.link.feed(data)
+
+    def start(self):
+        self._running = True
+        self.link.start()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        return self.port
+
+    def close(self):
+        self._running = False
+        if self._reader is not None:
+            self._reader.join(timeout=1)
+        self.link.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve a simulated car on a pseudo-terminal.")
+    parser.add_argument('--protocol', type=int, choices=(LEGACY_VERSION, PROTOCOL_VERSION),
+                        default=PROTOCOL_VERSION)
+    parser.add_argument('--baud-rate', type=int, default=9600, help="0 disables throttling")
+    parser.add_argument('--latency', type=float, default=0.0, help="one-way link latency in ms")
+    args = parser.parse_args()
+
+    simulator = PtyFirmware(args.protocol, args.baud_rate or None, args.latency / 1000)
+    port = simulator.start()
+    report(f"Simulated car listening on {port} (Ctrl+C to stop).", style="bold green")
+    try:
+        while True:
+            time.sleep(1)
+            report(simulator.firmware.status(), style="dim")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import importlib
+
+frontends = {
+    "vosk": (".vosk_frontend", "VoskFrontend"),
+    "speech_recognition": (".speech_frontend", "SpeechRecognitionFrontend"),
+    "wav": (".wav_frontend", "WavFrontend"),
+}
+
+
+def load_frontend(name):
+    module_name, class_name = frontends[name]
+    return getattr(importlib.import_module(module_name, __package__), class_name)
@@ -0,0 +1,157 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+import speech_recognition as sr
+
+
+class GoogleBackend:
+    name = "google"
+
+    def __init__(self, recognizer, timeout=None):
+        self.recognizer = recognizer
+        # recognize_google has no timeout of its own; a hung request would hold its worker forever.
+        if timeout is not None:
+            self.recognizer.operation_timeout = timeout
+
+    def __call__(self, audio):
+        result = self.recognizer.recognize_google(audio, show_all=True)
+        if not result or not result.get("alternative"):
+            raise sr.UnknownValueError()
+        best = result["alternative"][0]
+        return best["transcript"], best.get("confidence", 1.0)
+
+
+class VoskBackend:
+    name = "vosk"
+
+    def __init__(self, model_path, rate=16000):
+        from vosk import Model
+        self.model = Model(model_path)
+        self.rate = rate
+
+    def __call__(self, audio):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, self.rate)
+        recognizer.SetWords(True)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.rate, convert_width=2))
+        result = json.loads(recognizer.FinalResult())
+        words = result.get("result", [])
+        if not result.get("text") or not words:
+            raise sr.UnknownValueError()
+        return result["text"], sum(word["conf"] for word in words) / len(words)
+
+
+class StubBackend:
+    def __init__(self, text, confidence=1.0, delay=0.0, failure_rate=0.0, name="stub", seed=None):
+        self.text = text
+        self.confidence = confidence
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.name = name
+        self.random = random.Random(seed)
+
+    def __call__(self, audio):
+        time.sleep(self.delay)
+        if self.random.random() < self.failure_rate:
+            raise sr.RequestError("injected failure")
+        return self.text, self.confidence
+
+
+class HedgedRecognizer:
+    def __init__(self, backends, latency_budget=2.0, min_confidence=0.6):
+        self.backends = backends
+        self.latency_budget = latency_budget
+        self.min_confidence = min_confidence
+        # One worker per backend, so a hung backend can never starve the others.
+        self.executors = {backend.name: ThreadPoolExecutor(max_workers=1,
+                                                           thread_name_prefix=f"transcribe-{backend.name}")
+                          for backend in backends}
+        self.in_flight = {}
+        self.wins = {backend.name: 0 for backend in backends}
+        self.skipped = {backend.name: 0 for backend in backends}
+
+    def transcribe(self, audio):
+        started = time.monotonic()
+        futures = {}
+        for backend in self.backends:
+            previous = self.in_flight.get(backend.name)
+            if previous is not None and not previous.done():
+                # Still busy with an earlier utterance; queueing behind it would only add latency.
+                self.skipped[backend.name] += 1
+                continue
+            future = self.executors[backend.name].submit(backend, audio)
+            self.in_flight[backend.name] = future
+            futures[future] = backend
+        if not futures:
+            raise sr.RequestError("every recognition backend is still busy")
+
+        best = None
+        errors = []
+        try:
+            for future in as_completed(futures, timeout=self.latency_budget):
+                backend = futures[future]
+                try:
+                    text, confidence = future.result()
+                except (sr.UnknownValueError, sr.RequestError) as e:
+                    errors.append(e)
+                    continue
+                if best is None or confidence > best[1]:
+                    best = (text, confidence, backend.name)
+                if confidence >= self.min_confidence:
+                    break
+        except FutureTimeout:
+            pass
+
+        for future in futures:
+            future.cancel()
+        if best is None:
+            if errors and all(isinstance(e, sr.RequestError) for e in errors):
+                raise sr.RequestError("all recognition backends failed")
+            raise sr.UnknownValueError()
+
+        text, confidence, name = best
+        self.wins[name] += 1
+        return text, confidence, name, time.monotonic() - started
+
+    def shutdown(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    # Races stub backends through the scenarios the hedge exists for.
+    failures = []
+
+    def check(name, backends, expected, budget=0.5, utterances=1):
+        hedged = HedgedRecognizer(backends, latency_budget=budget)
+        for index in range(utterances):
+            started = time.monotonic()
+            try:
+                outcome = hedged.transcribe(None)[2]
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                outcome = type(e).__name__
+            elapsed = time.monotonic() - started
+            if outcome != expected or elapsed > budget + 0.1:
+                failures.append(f"{name} #{index + 1}: got {outcome} after {elapsed:.2f} s, expected {expected}")
+        hedged.shutdown()
+        print(f"{name}: {hedged.wins}, skipped {hedged.skipped}")
+
+    def local():
+        return StubBackend("move forward", 0.9, delay=0.05, name="vosk")
+
+    check("slow cloud", [StubBackend("move forward", 0.95, delay=3.0, name="google"), local()],
+          "vosk", utterances=8)
+    check("failing cloud", [StubBackend("move forward", 0.95, failure_rate=1.0, name="google"), local()],
+          "vosk", utterances=5)
+    check("confident cloud", [StubBackend("move forward", 0.95, delay=0.1, name="google"),
+                              StubBackend("move forward", 0.4, delay=0.01, name="vosk")], "google")
+    check("budget expiry", [StubBackend("move forward", 0.95, delay=2.0, name="google"),
+                            StubBackend("move forward", 0.9, delay=2.0, name="vosk")],
+          "UnknownValueError", budget=0.3)
+    check("all failing", [StubBackend("x", failure_rate=1.0, name="google"),
+                          StubBackend("x", failure_rate=1.0, name="vosk")], "RequestError")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    raise SystemExit(1 if failures else 0)
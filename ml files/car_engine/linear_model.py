@@ -0,0 +1,246 @@
+import os
+import re
+import sys
+import time
+import numpy as np
+
+min_probability = 1e-7
+default_token_pattern = r"(?u)\b\w\w+\b"
+
+
+def export_pipeline(pipeline):
+    vectorizer, svc = pipeline.steps[0][1], pipeline.steps[-1][1]
+    if getattr(svc, 'kernel', None) != 'linear':
+        raise ValueError("Only linear-kernel SVC pipelines can be exported")
+    if vectorizer.ngram_range != (1, 1) or vectorizer.sublinear_tf or vectorizer.norm != 'l2':
+        raise ValueError("Only unigram, l2-normalised TF-IDF vectorizers can be exported")
+    # The compiled scorer only reproduces the default word tokenizer on raw counts.
+    if (vectorizer.analyzer != 'word' or vectorizer.binary or vectorizer.strip_accents is not None or
+            vectorizer.preprocessor is not None or vectorizer.tokenizer is not None):
+        raise ValueError("Only word-analyzer vectorizers without custom preprocessing can be exported")
+
+    vocabulary = np.empty(len(vectorizer.vocabulary_), dtype=object)
+    for term, index in vectorizer.vocabulary_.items():
+        vocabulary[index] = term
+
+    coef = svc.coef_
+    coef = coef.toarray() if hasattr(coef, 'toarray') else np.asarray(coef)
+    n_classes = len(svc.classes_)
+    pairs = np.array([(i, j) for i in range(n_classes)
+                     for j in range(i + 1, n_classes)], dtype=np.int64)
+
+    return {
+        "vocabulary": vocabulary.astype(str),
+        "idf": vectorizer.idf_.astype(np.float64),
+        "weights": coef.T.astype(np.float64),
+        "intercept": svc.intercept_.astype(np.float64),
+        "pairs": pairs,
+        "prob_a": np.asarray(getattr(svc, 'probA_', []), dtype=np.float64),
+        "prob_b": np.asarray(getattr(svc, 'probB_', []), dtype=np.float64),
+        "classes": np.asarray(svc.classes_).astype(str),
+        "lowercase": np.array(vectorizer.lowercase),
+        "token_pattern": np.array(vectorizer.token_pattern or default_token_pattern),
+    }
+
+
+def compile_pipeline(pipeline):
+    return LinearCommandClassifier(**export_pipeline(pipeline))
+
+
+def save_exported(exported, path):
+    np.savez(path, **exported)
+
+
+def couple_probabilities(pairwise):
+    # Solves the pairwise-coupling problem of libsvm's multiclass_probability()
+    # exactly for a batch of (n_classes, n_classes) matrices; libsvm iterates
+    # towards the same optimum and stops within 0.005 / n_classes of it.
+    n_samples, n_classes, _ = pairwise.shape
+    transposed = np.swapaxes(pairwise, 1, 2)
+    diagonal = np.arange(n_classes)
+    system = np.zeros((n_samples, n_classes + 1, n_classes + 1))
+    system[:, :n_classes, :n_classes] = -transposed * pairwise
+    system[:, diagonal, diagonal] = (transposed ** 2).sum(axis=2) - pairwise[:, diagonal, diagonal] ** 2
+    system[:, :n_classes, n_classes] = 1
+    system[:, n_classes, :n_classes] = 1
+    rhs = np.zeros((n_samples, n_classes + 1, 1))
+    rhs[:, n_classes] = 1
+    return np.linalg.solve(system, rhs)[:, :n_classes, 0]
+
+
+class LinearCommandClassifier:
+    def __init__(self, vocabulary, idf, weights, intercept, pairs, prob_a, prob_b,
+                 classes, lowercase=True, token_pattern=default_token_pattern):
+        self.vocabulary = {term: index for index, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.weights = weights
+        self.intercept = intercept
+        self.pairs = pairs
+        self.prob_a = prob_a
+        self.prob_b = prob_b
+        self.classes_ = classes
+        self.lowercase = bool(lowercase)
+        self.token_re = re.compile(str(token_pattern))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def features(self, text):
+        if self.lowercase:
+            text = text.lower()
+        counts = {}
+        for token in self.token_re.findall(text):
+            index = self.vocabulary.get(token)
+            if index is not None:
+                counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        values *= self.idf[indices]
+        norm = np.sqrt(values @ values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def decision(self, texts):
+        rows, indices, values = [], [], []
+        for row, text in enumerate(texts):
+            text_indices, text_values = self.features(text)
+            rows.append(np.full(len(text_indices), row))
+            indices.append(text_indices)
+            values.append(text_values)
+        decision = np.tile(self.intercept, (len(texts), 1))
+        if rows:
+            indices = np.concatenate(indices)
+            np.add.at(decision, np.concatenate(rows),
+                      np.concatenate(values)[:, None] * self.weights[indices])
+        return decision
+
+    def _vote(self, decision):
+        votes = np.zeros((len(decision), len(self.classes_)), dtype=np.int64)
+        winners = np.where(decision > 0, self.pairs[:, 0], self.pairs[:, 1])
+        np.add.at(votes, (np.arange(len(decision))[:, None], winners), 1)
+        return votes.argmax(axis=1)
+
+    def _probabilities(self, decision):
+        n_classes = len(self.classes_)
+        r = 1.0 / (1.0 + np.exp(decision * self.prob_a + self.prob_b))
+        r = np.clip(r, min_probability, 1 - min_probability)
+        pairwise = np.zeros((len(decision), n_classes, n_classes))
+        pairwise[:, self.pairs[:, 0], self.pairs[:, 1]] = r
+        pairwise[:, self.pairs[:, 1], self.pairs[:, 0]] = 1 - r
+        return couple_probabilities(pairwise)
+
+    def predict(self, texts):
+        return self.classes_[self._vote(self.decision(texts))]
+
+    def predict_proba(self, texts):
+        return self._probabilities(self.decision(texts))
+
+    def classify_many(self, texts):
+        decision = self.decision(texts)
+        labels = self._vote(decision)
+        if len(self.prob_a) == 0:
+            return [(str(self.classes_[label]), None) for label in labels]
+        probabilities = self._probabilities(decision)
+        return [(str(self.classes_[label]), float(probabilities[row, label]))
+                for row, label in enumerate(labels)]
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+
+def classify_many(model, texts):
+    texts = list(texts)
+    if not texts:
+        return []
+    if hasattr(model, 'classify_many'):
+        return model.classify_many(texts)
+
+    labels = model.predict(texts)
+    if not hasattr(model, 'predict_proba'):
+        return [(label.item() if hasattr(label, 'item') else label, None) for label in labels]
+    probabilities = model.predict_proba(texts)
+    columns = {label: column for column, label in enumerate(model.classes_)}
+    return [(label.item() if hasattr(label, 'item') else label,
+             float(probabilities[row, columns[label]]))
+            for row, label in enumerate(labels)]
+
+
+def exported_path(pickle_path):
+    return os.path.splitext(pickle_path)[0] + '.npz'
+
+
+def load_classifier(pickle_path):
+    compiled_path = exported_path(pickle_path)
+    if os.path.exists(compiled_path) and (
+            not os.path.exists(pickle_path) or
+            os.path.getmtime(compiled_path) >= os.path.getmtime(pickle_path)):
+        return LinearCommandClassifier.load(compiled_path)
+
+    import joblib
+    pipeline = joblib.load(pickle_path)
+    try:
+        exported = export_pipeline(pipeline)
+    except (ValueError, AttributeError):
+        return pipeline
+    try:
+        save_exported(exported, compiled_path)
+    except OSError:
+        # Read-only model directory: compile in memory and export again next time.
+        return LinearCommandClassifier(**exported)
+    return LinearCommandClassifier.load(compiled_path)
+
+
+def verify(pipeline, compiled, texts):
+    texts = list(texts)
+    expected = pipeline.predict(texts)
+    actual = compiled.predict(texts)
+    mismatches = [(text, e, a) for text, e, a in zip(texts, expected, actual) if e != a]
+    proba_error = np.abs(pipeline.predict_proba(texts) - compiled.predict_proba(texts)).max()
+    return mismatches, proba_error
+
+
+def benchmark(predict, texts, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            predict([text])
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1e6
+
+
+if __name__ == "__main__":
+    import joblib
+    from rich.console import Console
+    from dataset import build_dataset
+
+    console = Console()
+    pickle_path = sys.argv[1] if len(sys.argv) > 1 else 'voice_command_model.pkl'
+    pipeline = joblib.load(pickle_path)
+    save_exported(export_pipeline(pipeline), exported_path(pickle_path))
+    compiled = LinearCommandClassifier.load(exported_path(pickle_path))
+    console.print(f"[bold green]Exported {pickle_path} to {exported_path(pickle_path)}[/bold green]")
+
+    texts = build_dataset()['command'].tolist()
+    mismatches, proba_error = verify(pipeline, compiled, texts)
+    if mismatches:
+        for text, expected, actual in mismatches[:10]:
+            console.print(f"[bold red]'{text}': sklearn {expected}, compiled {actual}[/bold red]")
+        raise SystemExit(f"{len(mismatches)} of {len(texts)} predictions differ")
+    console.print(f"[bold green]All {len(texts)} predictions match; max probability error {proba_error:.2e}[/bold green]")
+
+    sample = texts[:500]
+    sklearn_us = benchmark(pipeline.predict, sample)
+    compiled_us = benchmark(compiled.predict, sample)
+    console.print(f"sklearn pipeline: {sklearn_us:.1f} us/utterance")
+    console.print(f"compiled linear:  {compiled_us:.1f} us/utterance ({sklearn_us / compiled_us:.1f}x faster)")
+
+    chained = "forward 20 and left 90 and forward 10 and headlight on".split(' and ')
+    for name, classifier in (("sklearn pipeline", pipeline), ("compiled linear", compiled)):
+        per_clause = benchmark(lambda _: [classify_many(classifier, [clause]) for clause in chained], [None] * 200)
+        batched = benchmark(lambda _: classify_many(classifier, chained), [None] * 200)
+        console.print(f"{name} chained utterance: {per_clause:.1f} us per clause call, "
+                      f"{batched:.1f} us batched ({per_clause / batched:.1f}x)")
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+from .console import report
+from . import tracing
+
+
+class MotionScheduler:
+    def __init__(self, start_motion, stop_motion, history=100):
+        self.start_motion = start_motion
+        self.stop_motion = stop_motion
+        self.jobs = deque()
+        self.stop_lateness = deque(maxlen=history)
+        self._changed = threading.Condition()
+        self._preempted = False
+        self._running = False
+        self._busy = False
+        self._thread = None
+
+    @property
+    def queue_depth(self):
+        with self._changed:
+            return len(self.jobs) + (1 if self._busy else 0)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, commands, preempt=False, trace=None):
+        with self._changed:
+            if preempt:
+                self.jobs.clear()
+                self._preempted = self._busy
+            self.jobs.extend((command, trace) for command in commands)
+            self._changed.notify_all()
+
+    def stop(self):
+        self.submit([], preempt=True)
+
+    def shutdown(self):
+        with self._changed:
+            self._running = False
+            self.jobs.clear()
+            self._preempted = self._busy
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _next_job(self):
+        with self._changed:
+            while self._running and not self.jobs:
+                self._changed.wait()
+            if not self._running:
+                return None
+            self._busy = True
+            self._preempted = False
+            return self.jobs.popleft()
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+
+            (action, value), trace = job
+            tracing.activate(trace)
+            duration = self.start_motion(action, value)
+            if duration is not None:
+                deadline = time.monotonic() + duration
+                with self._changed:
+                    while not self._preempted:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._changed.wait(remaining)
+                    preempted = self._preempted
+                self.stop_motion(preempted)
+                if preempted:
+                    report("Motion preempted before its deadline.", style="bold yellow")
+                else:
+                    lateness_ms = (time.monotonic() - deadline) * 1000
+                    self.stop_lateness.append(lateness_ms)
+                    report(f"Stop fired {lateness_ms:.1f} ms after deadline "
+                           f"(queue depth {len(self.jobs)}).", style="dim")
+
+            with self._changed:
+                self._busy = False
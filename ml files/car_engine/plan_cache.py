@@ -0,0 +1,70 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+# Commas between digits are kept: "1,000" and "1 000" parse to different quantities.
+normalize_re = re.compile(r"[^\w\s.,]+|\.(?!\d)|(?<!\d),|,(?!\d)")
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_transcript(text):
+    return " ".join(normalize_re.sub(" ", text.lower()).split())
+
+
+class PlanCache:
+    def __init__(self, max_size=256, model_path=None, on_model_change=None):
+        self.max_size = max_size
+        self.model_path = model_path
+        self.on_model_change = on_model_change
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._model_mtime = None
+        self.model_hash = None
+        self.invalidate_if_changed()
+
+    def invalidate_if_changed(self):
+        if self.model_path is None or not os.path.exists(self.model_path):
+            return
+        mtime = os.path.getmtime(self.model_path)
+        if mtime == self._model_mtime:
+            return
+        self._model_mtime = mtime
+        model_hash = file_digest(self.model_path)
+        if model_hash != self.model_hash:
+            # Plans built by the old model must not come back, and new ones must come from the new model.
+            retrained = self.model_hash is not None
+            self.entries.clear()
+            self.model_hash = model_hash
+            if retrained and self.on_model_change is not None:
+                self.on_model_change()
+
+    def resolve(self, text, build_plan):
+        self.invalidate_if_changed()
+        key = (self.model_hash, normalize_transcript(text))
+        plan = self.entries.get(key)
+        if plan is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return list(plan)
+
+        self.misses += 1
+        plan = tuple(build_plan(text))
+        self.entries[key] = plan
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return list(plan)
+
+    def status(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0
+        return (f"Plan cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+                f"{len(self.entries)}/{self.max_size} entries")
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+# Rough cost of one extra command: a stop, a start and a serial round trip.
+command_overhead = 0.05
+
+PlanEstimate = namedtuple("PlanEstimate", "commands motion_seconds total_seconds")
+
+turn_sign = {"4": 1, "3": -1}
+headlight_opcodes = {"5", "6"}
+
+
+def estimate(commands, motion_delay, command_names, overhead=command_overhead):
+    motion = sum(motion_delay(command_names[opcode], value) for opcode, value in commands)
+    return PlanEstimate(len(commands), motion, motion + overhead * len(commands))
+
+
+def fuse_turns(net, first_opcode):
+    net %= 360
+    if net > 180 or (net == 180 and first_opcode == "3"):
+        net -= 360
+    if net == 0:
+        return None
+    return ("4", net) if net > 0 else ("3", -net)
+
+
+def lamp_state(commands):
+    for opcode, _ in reversed(commands):
+        if opcode in headlight_opcodes:
+            return opcode
+    return None
+
+
+def optimize(commands):
+    optimized = []
+    for opcode, value in commands:
+        if opcode in turn_sign:
+            net = turn_sign[opcode] * value
+            first = opcode
+            if optimized and optimized[-1][0] in turn_sign:
+                previous, previous_value = optimized.pop()
+                net += turn_sign[previous] * previous_value
+                first = previous
+            turn = fuse_turns(net, first)
+            if turn is not None:
+                optimized.append(turn)
+        elif opcode in headlight_opcodes:
+            # Back-to-back toggles collapse to the last; it is dropped if the lamp is already there.
+            if optimized and optimized[-1][0] in headlight_opcodes:
+                optimized.pop()
+            if opcode != lamp_state(optimized):
+                optimized.append((opcode, 0))
+        elif value <= 0:
+            continue
+        elif optimized and optimized[-1][0] == opcode:
+            optimized[-1] = (opcode, optimized[-1][1] + value)
+        else:
+            optimized.append((opcode, value))
+    return optimized
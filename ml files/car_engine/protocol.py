@@ -0,0 +1,43 @@
+import time
+
+PROTOCOL_VERSION = 2
+LEGACY_VERSION = 1
+VERSION_QUERY = b"V\n"
+
+
+def checksum(payload):
+    value = 0
+    for byte in payload.encode():
+        value ^= byte
+    return f"{value:02X}"
+
+
+def encode_frame(opcode, duration_ms=0):
+    payload = f"{opcode},{int(round(duration_ms))}"
+    return f"{payload}*{checksum(payload)}\n".encode()
+
+
+def encode_legacy(opcode):
+    return f"{opcode}\n".encode()
+
+
+def decode_frame(line):
+    line = line.strip()
+    if '*' not in line:
+        return line, None
+    payload, received = line.rsplit('*', 1)
+    if checksum(payload) != received.upper():
+        raise ValueError(f"Checksum mismatch in frame '{line}'")
+    opcode, _, value = payload.partition(',')
+    return opcode, int(value) if value else 0
+
+
+def negotiate_version(ser, timeout=0.5):
+    ser.reset_input_buffer()
+    ser.write(VERSION_QUERY)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = ser.readline().decode(errors='ignore').strip()
+        if line.startswith('V') and line[1:].isdigit():
+            return min(int(line[1:]), PROTOCOL_VERSION)
+    return LEGACY_VERSION
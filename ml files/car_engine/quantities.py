@@ -0,0 +1,241 @@
+import re
+from collections import namedtuple
+
+Quantity = namedtuple("Quantity", "value unit")
+Clause = namedtuple("Clause", "text quantities")
+
+token_pattern = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|[a-z]+|°|-")
+
+small_numbers = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15,
+    "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+tens = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+scales = {"hundred": 100, "thousand": 1000}
+
+# Spoken unit -> (canonical unit, factor to convert into it).
+unit_words = {
+    "mm": ("cm", 0.1), "millimeter": ("cm", 0.1), "millimeters": ("cm", 0.1),
+    "millimetre": ("cm", 0.1), "millimetres": ("cm", 0.1),
+    "cm": ("cm", 1), "centimeter": ("cm", 1), "centimeters": ("cm", 1),
+    "centimetre": ("cm", 1), "centimetres": ("cm", 1),
+    "m": ("cm", 100), "meter": ("cm", 100), "meters": ("cm", 100),
+    "metre": ("cm", 100), "metres": ("cm", 100),
+    "inch": ("cm", 2.54), "inches": ("cm", 2.54), "foot": ("cm", 30.48), "feet": ("cm", 30.48),
+    "°": ("deg", 1), "deg": ("deg", 1), "degree": ("deg", 1), "degrees": ("deg", 1),
+    "radian": ("deg", 57.29577951308232), "radians": ("deg", 57.29577951308232),
+    "s": ("s", 1), "sec": ("s", 1), "secs": ("s", 1), "second": ("s", 1), "seconds": ("s", 1),
+    "ms": ("s", 0.001), "millisecond": ("s", 0.001), "milliseconds": ("s", 0.001),
+}
+
+# Word -> (kind, value), so the scanner needs one lookup per token.
+lexicon = {}
+lexicon.update({word: ("small", value) for word, value in small_numbers.items()})
+lexicon.update({word: ("tens", value) for word, value in tens.items()})
+lexicon.update({word: ("scale", value) for word, value in scales.items()})
+lexicon.update({word: ("unit", conversion) for word, conversion in unit_words.items()})
+lexicon.update({"point": ("point", None), "and": ("and", None), "-": ("hyphen", None), "a": ("a", None)})
+
+number_kinds = {"small", "tens", "scale", "digits"}
+
+
+plain_word = ("word", None)
+
+
+def classify_token(token):
+    kind = lexicon.get(token, plain_word)
+    if kind is plain_word and token[0].isdigit():
+        return "digits", digits_value(token)
+    return kind
+
+
+def digits_value(token):
+    token = token.replace(',', '')
+    return float(token) if '.' in token else int(token)
+
+
+class NumberBuilder:
+    def __init__(self):
+        self.total = 0
+        self.current = 0
+        self.decimals = None
+        self.decimal_state = None
+        self.malformed = False
+        self.scaled = False
+        self.after_digits = False
+
+    # After "point" the fraction is either spoken digit by digit ("one five"),
+    # as one spoken number below a hundred ("fifteen", "twenty five") or as
+    # one written group ("15").
+    def accepts_decimal(self, kind, value, token):
+        if kind == "digits" and not (token or str(value)).isdigit():
+            return False
+        if self.decimal_state is None:
+            return kind in ("small", "tens", "digits")
+        if self.decimal_state == "spelled digits":
+            return kind in ("small", "digits") and value < 10
+        if self.decimal_state == "tens":
+            return kind == "small" and value < 10
+        return False
+
+    def add_decimal(self, kind, value, token):
+        if self.decimal_state == "tens":
+            self.decimals = self.decimals[:-1] + str(value)
+            self.decimal_state = "closed"
+            return
+        digits = token if kind == "digits" else str(value)
+        self.decimals += digits
+        if kind == "tens":
+            self.decimal_state = "tens"
+        else:
+            self.decimal_state = "spelled digits" if len(digits) == 1 else "closed"
+
+    def accepts(self, kind, value, token=None):
+        if self.decimals is not None:
+            return self.accepts_decimal(kind, value, token)
+        if kind == "scale":
+            return self.current < 100 if value == 100 else self.total == 0 and self.current < 1000
+        if self.after_digits:
+            return False
+        last = self.current % 100
+        if kind == "small":
+            return last == 0 or (value < 10 and last >= 20 and last % 10 == 0)
+        if kind == "tens":
+            return last == 0
+        return False
+
+    def add(self, kind, value, token=None):
+        if self.decimals is not None:
+            self.add_decimal(kind, value, token if kind == "digits" and token else str(value))
+        elif kind == "scale":
+            if value == 1000:
+                self.total += (self.current or 1) * 1000
+                self.current = 0
+            else:
+                self.current = (self.current or 1) * 100
+            self.scaled = True
+            self.after_digits = False
+        else:
+            self.current += value
+            self.after_digits = kind == "digits"
+
+    def start_decimals(self):
+        self.decimals = ""
+
+    def value(self):
+        whole = self.total + self.current
+        if self.decimals:
+            return whole + float("0." + self.decimals)
+        return whole
+
+
+# Splits a transcript into clauses and pulls typed quantities out of each in
+# one scan. "and" only separates clauses when it is not joining the parts of
+# a spoken number ("one hundred and twenty"). Quantities followed by a unit
+# are converted to cm, degrees or seconds.
+def parse(text):
+    tokens = token_pattern.findall(text.lower())
+    count = len(tokens)
+    clauses = []
+    words = []
+    quantities = []
+    number = None
+    index = 0
+
+    lookup = lexicon.get
+    while index < count:
+        token = tokens[index]
+        kind, value = lookup(token, plain_word)
+        index += 1
+        if kind == "word":
+            if token[0].isdigit():
+                kind, value = "digits", digits_value(token)
+            elif number is None:
+                words.append(token)
+                continue
+        following = classify_token(tokens[index])[0] if index < count else None
+
+        if number is not None:
+            if kind == "point" and number.decimals is None and following in ("small", "tens", "digits"):
+                number.start_decimals()
+                words.append(token)
+                continue
+            if kind in ("and", "hyphen") and number.scaled and following in ("small", "tens"):
+                words.append(token)
+                continue
+            if kind == "hyphen" and following == "small":
+                continue
+            if number.accepts(kind, value, token):
+                number.add(kind, value, token)
+                words.append(token)
+                continue
+            if number.decimals is not None and kind in number_kinds:
+                # A fraction we cannot read: its tail must not pass for a quantity of its own.
+                number.malformed = True
+                words.append(token)
+                continue
+
+            amount = number.value()
+            malformed = number.malformed
+            number = None
+            if kind == "unit":
+                unit, factor = value
+                if not malformed:
+                    quantities.append(Quantity(amount * factor, unit))
+                words.append(token)
+                continue
+            if not malformed:
+                quantities.append(Quantity(amount, None))
+
+        if kind in number_kinds or (kind == "a" and following == "scale") or (
+                kind == "point" and following in ("small", "tens", "digits")):
+            number = NumberBuilder()
+            if kind == "point":
+                number.start_decimals()
+            elif kind != "a":
+                number.add(kind, value)
+            words.append(token)
+        elif kind == "and":
+            if words:
+                clauses.append(Clause(" ".join(words), quantities))
+            words, quantities = [], []
+        elif kind != "hyphen":
+            words.append(token)
+
+    if number is not None and not number.malformed:
+        quantities.append(Quantity(number.value(), None))
+    if words:
+        clauses.append(Clause(" ".join(words), quantities))
+    return clauses
+
+
+def first_quantity(quantities, unit):
+    for quantity in quantities:
+        if quantity.unit == unit:
+            return quantity.value
+    for quantity in quantities:
+        if quantity.unit is None:
+            return quantity.value
+    return None
+
+
+def distance_cm(quantities, seconds_per_cm, default=50):
+    value = first_quantity(quantities, "cm")
+    if value is None:
+        seconds = first_quantity(quantities, "s")
+        value = seconds / seconds_per_cm if seconds is not None else default
+    return int(round(value))
+
+
+def angle_degrees(quantities, seconds_per_degree, default=90):
+    value = first_quantity(quantities, "deg")
+    if value is None:
+        seconds = first_quantity(quantities, "s")
+        value = seconds / seconds_per_degree if seconds is not None else default
+    return int(round(value))
+
@@ -0,0 +1,122 @@
+import os
+import queue
+import time
+
+from .console import report
+from . import tracing
+from .startup import timed_import
+from .vosk_frontend import default_model_path
+
+phrase_time_limit = 3
+calibration_duration = 1.0
+recalibration_duration = 0.3
+recalibration_interval = 60
+
+
+class ListeningSession:
+    def __init__(self, sr):
+        self.recognizer = sr.Recognizer()
+        self.recognizer.dynamic_energy_threshold = True
+        self.microphone = sr.Microphone()
+        self.phrases = queue.Queue()
+        self.last_calibration = 0
+        self._stop_listening = None
+
+    def calibrate(self, duration):
+        with self.microphone as source:
+            self.recognizer.adjust_for_ambient_noise(source, duration=duration)
+        self.last_calibration = time.monotonic()
+        report(f"Energy threshold calibrated to {self.recognizer.energy_threshold:.0f}", style="dim")
+
+    def start(self):
+        self.calibrate(calibration_duration)
+        self._listen()
+
+    def _listen(self):
+        self._stop_listening = self.recognizer.listen_in_background(
+            self.microphone, self._on_phrase, phrase_time_limit=phrase_time_limit)
+        report("Listening for commands...", style="bold blue")
+
+    def _on_phrase(self, recognizer, audio):
+        self.phrases.put((time.monotonic(), audio))
+
+    def recalibrate_if_due(self):
+        if time.monotonic() - self.last_calibration < recalibration_interval:
+            return
+        if not self.phrases.empty():
+            return
+        self._stop_listening(wait_for_stop=True)
+        self.calibrate(recalibration_duration)
+        self._listen()
+
+    def stop(self):
+        if self._stop_listening is not None:
+            self._stop_listening(wait_for_stop=False)
+
+
+class SpeechRecognitionFrontend:
+    name = "speech_recognition"
+    live = True
+
+    def __init__(self, cloud_backend=None, local_fallback=True, vosk_model_path=default_model_path,
+                 latency_budget=2.0, min_confidence=0.6):
+        self.cloud_backend = cloud_backend
+        self.local_fallback = local_fallback
+        self.vosk_model_path = vosk_model_path
+        self.latency_budget = latency_budget
+        self.min_confidence = min_confidence
+        self.sr = None
+        self.session = None
+        self.transcriber = None
+
+    def load(self):
+        self.sr = timed_import('speech_recognition')
+        from .hedged_recognizer import HedgedRecognizer, GoogleBackend, VoskBackend
+
+        self.session = ListeningSession(self.sr)
+        backends = [self.cloud_backend or GoogleBackend(self.session.recognizer, self.latency_budget)]
+        if self.local_fallback and os.path.exists(self.vosk_model_path):
+            timed_import('vosk')
+            backends.append(VoskBackend(self.vosk_model_path))
+        elif self.local_fallback:
+            report("Vosk model directory not found, running without local fallback.", style="bold yellow")
+        self.transcriber = HedgedRecognizer(backends, self.latency_budget, self.min_confidence)
+        return self.transcriber
+
+    def start(self):
+        self.session.start()
+
+    def stop(self):
+        if self.session is not None:
+            self.session.stop()
+        if self.transcriber is not None:
+            self.transcriber.shutdown()
+
+    def recognize_speech(self, timeout=1):
+        try:
+            ended, audio = self.session.phrases.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+        tracing.begin(ended - len(audio.frame_data) / (audio.sample_rate * audio.sample_width))
+        tracing.mark("end_of_speech", ended)
+        try:
+            text, confidence, backend, elapsed = self.transcriber.transcribe(audio)
+            tracing.mark("transcript")
+            report(f"Recognized command: {text} ({backend}, {confidence:.2f}, {elapsed * 1000:.0f} ms)",
+                   style="bold green")
+            return text
+        except self.sr.UnknownValueError:
+            tracing.mark("transcript")
+            report("Sorry, I did not understand the audio.", style="bold red")
+        except self.sr.RequestError:
+            tracing.mark("transcript")
+            report("Sorry, my speech recognition service is down.", style="bold red")
+        return None
+
+    def transcripts(self):
+        while True:
+            text = self.recognize_speech()
+            if text is None:
+                self.session.recalibrate_if_due()
+            yield text, True, time.monotonic()
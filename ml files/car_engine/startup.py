@@ -0,0 +1,45 @@
+import importlib
+import sys
+import time
+
+startup_timings = {}
+heavy_modules = ["rich", "vosk", "pyaudio", "speech_recognition", "serial", "sklearn", "keyboard"]
+
+
+def timed_stage(name, load, *args):
+    from .console import report
+    started = time.perf_counter()
+    result = load(*args)
+    startup_timings[name] = time.perf_counter() - started
+    report(f"{name} ready in {startup_timings[name]:.2f} s", style="dim")
+    return result
+
+
+def timed_import(module_name):
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    started = time.perf_counter()
+    module = importlib.import_module(module_name)
+    startup_timings[f"import {module_name}"] = time.perf_counter() - started
+    return module
+
+
+def print_startup_profile():
+    from .console import plain_output
+    loaded = [name for name in heavy_modules if name in sys.modules]
+    skipped = [name for name in heavy_modules if name not in sys.modules]
+    rows = sorted(startup_timings.items(), key=lambda item: -item[1])
+    if plain_output:
+        for name, seconds in rows:
+            print(f"{name:<32}{seconds:8.3f} s")
+    else:
+        from rich.table import Table
+        from .console import get_console
+        table = Table(show_header=True, header_style="bold magenta", title="Startup profile")
+        table.add_column("Stage")
+        table.add_column("Seconds", justify="right")
+        for name, seconds in rows:
+            table.add_row(name, f"{seconds:.3f}")
+        get_console().print(table)
+    print(f"Heavy modules loaded: {', '.join(loaded) or 'none'}")
+    print(f"Heavy modules never imported: {', '.join(skipped) or 'none'}")
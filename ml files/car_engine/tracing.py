@@ -0,0 +1,154 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+spans = [
+    ("speech", "first_audio", "end_of_speech"),
+    ("recognition", "end_of_speech", "transcript"),
+    ("classification", "transcript", "classified"),
+    ("dispatch", "classified", "serial_write"),
+    ("link", "serial_write", "echo"),
+    ("motion", "serial_write", "stop_sent"),
+    ("speech to motors", "end_of_speech", "serial_write"),
+]
+
+quantiles = (0.5, 0.95, 0.99)
+
+# None while tracing is off, so every hook costs a single global lookup.
+tracer = None
+_local = threading.local()
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Tracer:
+    def __init__(self, capacity=256, jsonl_path=None, prometheus_path=None, prometheus_interval=1.0):
+        self.traces = deque(maxlen=capacity)
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.prometheus_interval = prometheus_interval
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._sink_lock = threading.Lock()
+        self._jsonl = open(jsonl_path, 'a', buffering=1) if jsonl_path else None
+        self._prometheus_written = 0.0
+
+    def begin(self, timestamp):
+        trace = {"id": next(self._ids), "stages": {"first_audio": timestamp}}
+        with self._lock:
+            self.traces.append(trace)
+        self._emit(trace, "first_audio", timestamp)
+        return trace
+
+    def mark(self, trace, stage, timestamp):
+        with self._lock:
+            if stage in trace["stages"]:
+                return
+            trace["stages"][stage] = timestamp
+        self._emit(trace, stage, timestamp)
+
+    def _emit(self, trace, stage, timestamp):
+        with self._sink_lock:
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps({"trace": trace["id"], "stage": stage, "t": timestamp}) + "\n")
+            if self.prometheus_path and timestamp - self._prometheus_written >= self.prometheus_interval:
+                self._prometheus_written = timestamp
+                self.write_prometheus()
+
+    def span_summary(self):
+        with self._lock:
+            recorded = [dict(trace["stages"]) for trace in self.traces]
+        summary = {}
+        for name, start, end in spans:
+            values = sorted((marks[end] - marks[start]) * 1000 for marks in recorded
+                            if start in marks and end in marks)
+            if values:
+                summary[name] = (len(values), [percentile(values, q) for q in quantiles])
+        return summary
+
+    def write_prometheus(self):
+        lines = ["# HELP voice_car_stage_latency_seconds Latency between utterance stages.",
+                 "# TYPE voice_car_stage_latency_seconds summary"]
+        for name, (count, values) in self.span_summary().items():
+            label = name.replace(" ", "_")
+            for q, value in zip(quantiles, values):
+                lines.append(f'voice_car_stage_latency_seconds{{span="{label}",quantile="{q}"}} {value / 1000:.6f}')
+            lines.append(f'voice_car_stage_latency_seconds_count{{span="{label}"}} {count}')
+        temporary = f"{self.prometheus_path}.tmp"
+        with open(temporary, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temporary, self.prometheus_path)
+
+    def render(self):
+        from rich.panel import Panel
+        from rich.table import Table
+        table = Table(show_header=True, header_style="bold magenta", box=None)
+        table.add_column("Span")
+        table.add_column("n", justify="right")
+        for q in quantiles:
+            table.add_column(f"p{int(q * 100)} ms", justify="right")
+        for name, (count, values) in self.span_summary().items():
+            table.add_row(name, str(count), *(f"{value:.1f}" for value in values))
+        return Panel.fit(table, title="[bold cyan]Latency[/bold cyan]", border_style="green")
+
+    def summary_lines(self):
+        return [f"{name:<18} n={count:<4} " + " ".join(
+            f"p{int(q * 100)}={value:.1f}ms" for q, value in zip(quantiles, values))
+            for name, (count, values) in self.span_summary().items()]
+
+    def close(self):
+        with self._sink_lock:
+            if self.prometheus_path:
+                self.write_prometheus()
+            if self._jsonl is not None:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+def enable(capacity=256, jsonl_path=None, prometheus_path=None):
+    global tracer
+    tracer = Tracer(capacity, jsonl_path, prometheus_path)
+    return tracer
+
+
+def disable():
+    global tracer
+    if tracer is not None:
+        tracer.close()
+    tracer = None
+
+
+def current():
+    if tracer is None:
+        return None
+    return getattr(_local, "trace", None)
+
+
+def activate(trace):
+    if tracer is not None:
+        _local.trace = trace
+
+
+# Starts a trace for a new utterance on this thread, unless the current one
+# has not produced a transcript yet (more audio of the same utterance).
+def begin(timestamp=None):
+    if tracer is None:
+        return None
+    trace = getattr(_local, "trace", None)
+    if trace is None or "transcript" in trace["stages"]:
+        trace = tracer.begin(time.monotonic() if timestamp is None else timestamp)
+        _local.trace = trace
+    return trace
+
+
+def mark(stage, timestamp=None, trace=None):
+    if tracer is None:
+        return
+    trace = trace or getattr(_local, "trace", None)
+    if trace is not None:
+        tracer.mark(trace, stage, time.monotonic() if timestamp is None else timestamp)
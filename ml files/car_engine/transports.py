@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import deque
+
+from .console import report
+from . import tracing
+from .protocol import encode_frame, encode_legacy, negotiate_version, PROTOCOL_VERSION, LEGACY_VERSION
+
+
+class SerialTransport:
+    def __init__(self, port='COM13', baud_rate=9600, attempts=5, retry_delay=2,
+                 tick=0.005, max_backoff=8.0, echo_timeout=2.0, history=100, max_frame_age=0.5):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.tick = tick
+        self.max_backoff = max_backoff
+        self.echo_timeout = echo_timeout
+        self.max_frame_age = max_frame_age
+        self.ser = None
+        self.protocol_version = LEGACY_VERSION
+        self.pending = []
+        self.awaiting_echo = deque(maxlen=64)
+        self.round_trips = deque(maxlen=history)
+        self.frames_sent = 0
+        self.writes = 0
+        self.reconnects = 0
+        self.dropped = 0
+        self._changed = threading.Condition()
+        self._reconnecting = threading.Lock()
+        self._running = False
+        self._threads = []
+
+    @property
+    def is_connected(self):
+        return self._running
+
+    @property
+    def needs_host_stop(self):
+        return self.protocol_version < PROTOCOL_VERSION
+
+    def _open(self, negotiate=True):
+        import serial
+        self.ser = serial.serial_for_url(self.port, self.baud_rate, timeout=self.tick * 20)
+        if negotiate:
+            self.protocol_version = negotiate_version(self.ser)
+
+    def connect(self):
+        import serial
+        for attempt in range(1, self.attempts + 1):
+            try:
+                report(f"Attempt {attempt}: Trying to connect to Bluetooth device...", style="bold yellow")
+                self._open()
+                report(f"Connected to Bluetooth on port {self.port}.", style="bold green")
+                if self.needs_host_stop:
+                    report("Legacy firmware detected, timing motions on the host.", style="bold yellow")
+                else:
+                    report(f"Firmware speaks protocol v{self.protocol_version}.", style="bold green")
+                self._start_threads()
+                return True
+            except serial.SerialException as e:
+                report(f"Serial port error: {e}", style="bold red")
+                time.sleep(self.retry_delay)
+        report(f"Failed to connect to Bluetooth after {self.attempts} attempts.", style="bold red")
+        return False
+
+    def _start_threads(self):
+        self._running = True
+        self._threads = [threading.Thread(target=self._write_loop, daemon=True),
+                         threading.Thread(target=self._read_loop, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def _queue(self, frame, stage="serial_write"):
+        with self._changed:
+            self.pending.append((frame, stage, tracing.current(), time.monotonic()))
+            self._changed.notify()
+
+    def send_motion(self, opcode, duration):
+        if self.needs_host_stop:
+            self._queue(encode_legacy(opcode))
+        else:
+            self._queue(encode_frame(opcode, duration * 1000))
+
+    def send_stop(self):
+        self._queue(encode_legacy("0"), "stop_sent")
+
+    def _write_loop(self):
+        while True:
+            with self._changed:
+                while self._running and not self.pending:
+                    self._changed.wait()
+                if not self._running and not self.pending:
+                    return
+            # Give frames issued in the same scheduling tick a chance to join.
+            time.sleep(self.tick)
+            with self._changed:
+                batch, self.pending = self.pending, []
+            batch = self._drop_stale(batch)
+            if not batch:
+                continue
+
+            generation = self.reconnects
+            try:
+                self.ser.write(b"".join(frame for frame, _, _, _ in batch))
+                self.ser.flush()
+            except Exception as e:
+                # A motion resent after the link comes back would run late; only stops are kept.
+                stops = [entry for entry in batch if entry[1] == "stop_sent"]
+                self.dropped += len(batch) - len(stops)
+                with self._changed:
+                    self.pending[:0] = stops
+                if not self._reconnect(e, generation):
+                    return
+                continue
+
+            sent_at = time.monotonic()
+            self.writes += 1
+            self.frames_sent += len(batch)
+            for frame, stage, trace, _ in batch:
+                tracing.mark(stage, sent_at, trace)
+                self.awaiting_echo.append((frame.strip().decode(), sent_at, trace))
+
+    def _drop_stale(self, batch):
+        now = time.monotonic()
+        fresh = [entry for entry in batch
+                 if entry[1] == "stop_sent" or now - entry[3] <= self.max_frame_age]
+        if len(fresh) < len(batch):
+            self.dropped += len(batch) - len(fresh)
+            report(f"Dropped {len(batch) - len(fresh)} motion frames queued while the link was down.",
+                   style="bold yellow")
+        return fresh
+
+    def _read_loop(self):
+        while self._running:
+            generation = self.reconnects
+            try:
+                line = self.ser.readline()
+            except Exception as e:
+                if not self._reconnect(e, generation):
+                    return
+                continue
+            if not line:
+                continue
+            self._match_echo(line.decode(errors='ignore').strip(), time.monotonic())
+
+    def _match_echo(self, text, received_at):
+        while self.awaiting_echo and received_at - self.awaiting_echo[0][1] > self.echo_timeout:
+            self.awaiting_echo.popleft()
+        for index, (frame, sent_at, trace) in enumerate(self.awaiting_echo):
+            if frame == text:
+                del self.awaiting_echo[index]
+                tracing.mark("echo", received_at, trace)
+                self.round_trips.append((received_at - sent_at) * 1000)
+                return
+
+    # Both threads call this when the port fails; whichever comes second finds
+    # the generation already moved on and just retries on the new port.
+    def _reconnect(self, error, generation):
+        with self._reconnecting:
+            if self.reconnects != generation:
+                return self._running
+            return self._reopen(error)
+
+    def _reopen(self, error):
+        if not self._running:
+            return False
+        report(f"Serial link lost ({error}), reconnecting...", style="bold red")
+        backoff = 0.5
+        while self._running:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+            try:
+                # The reader thread is live, so keep the version negotiated at startup.
+                self._open(negotiate=False)
+                self.reconnects += 1
+                report(f"Reconnected to {self.port}.", style="bold green")
+                return True
+            except Exception:
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        return False
+
+    def status(self):
+        if self.round_trips:
+            ordered = sorted(self.round_trips)
+            latency = f"echo RTT p50 {ordered[len(ordered) // 2]:.1f} ms, max {ordered[-1]:.1f} ms"
+        else:
+            latency = "no echoes received"
+        return (f"Serial: {self.frames_sent} frames in {self.writes} writes, "
+                f"{latency}, {self.reconnects} reconnects, {self.dropped} stale frames dropped")
+
+    def close(self):
+        with self._changed:
+            self._running = False
+            self._changed.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        if self.ser is not None:
+            self.ser.close()
+            report(self.status(), style="dim")
+
+
+class SimulatorTransport:
+    def __init__(self, protocol_version=PROTOCOL_VERSION, baud_rate=None, latency=0.0, verbose=True):
+        from .firmware_sim import CarFirmware, FirmwareLink
+        self.protocol_version = protocol_version
+        self.verbose = verbose
+        self.frames = []
+        self.replies = []
+        self.awaiting_echo = {}
+        self.connected = False
+        self.firmware = CarFirmware(protocol_version)
+        self.link = FirmwareLink(self.firmware, self._received, baud_rate, latency)
+
+    @property
+    def is_connected(self):
+        return self.connected
+
+    @property
+    def needs_host_stop(self):
+        return self.protocol_version < PROTOCOL_VERSION
+
+    def connect(self):
+        self.link.start()
+        self.connected = True
+        report(f"Simulated car ready (protocol v{self.protocol_version}).", style="bold green")
+        return True
+
+    def _write(self, frame, stage="serial_write"):
+        sent_at = time.monotonic()
+        self.frames.append((sent_at, frame))
+        trace = tracing.current()
+        tracing.mark(stage, sent_at, trace)
+        if trace is not None:
+            self.awaiting_echo[frame.strip().decode()] = trace
+        if self.verbose:
+            report(f"[sim] {frame!r}", style="dim")
+        self.link.feed(frame)
+
+    def _received(self, line):
+        received_at = time.monotonic()
+        self.replies.append((received_at, line))
+        trace = self.awaiting_echo.pop(line.strip().decode(), None)
+        if trace is not None:
+            tracing.mark("echo", received_at, trace)
+
+    def send_motion(self, opcode, duration):
+        if self.needs_host_stop:
+            self._write(encode_legacy(opcode))
+        else:
+            self._write(encode_frame(opcode, duration * 1000))
+
+    def send_stop(self):
+        self._write(encode_legacy("0"), "stop_sent")
+
+    def status(self):
+        return self.firmware.status()
+
+    def close(self):
+        if self.connected:
+            self.link.stop()
+            report(self.status(), style="dim")
+        self.connected = False
+
+
+transports = {
+    "serial": SerialTransport,
+    "simulator": SimulatorTransport,
+}
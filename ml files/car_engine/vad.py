@@ -0,0 +1,70 @@
+from collections import deque
+import numpy as np
+
+
+class VoiceActivityGate:
+    def __init__(self, energy_threshold=300.0, zcr_threshold=0.3, hangover_frames=4, preroll_frames=2):
+        self.energy_threshold = energy_threshold
+        self.zcr_threshold = zcr_threshold
+        self.hangover_frames = hangover_frames
+        self.preroll = deque(maxlen=preroll_frames)
+        self.active = False
+        self.hangover = 0
+        self.total_frames = 0
+        self.forwarded_frames = 0
+        self.decode_seconds = 0.0
+        self.decoded_frames = 0
+
+    def is_speech(self, frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return False
+        rms = np.sqrt(np.mean(samples * samples))
+        zcr = np.count_nonzero(np.diff(np.signbit(samples))) / samples.size
+        # Voiced speech is loud; fricatives are quieter but cross zero often.
+        return rms >= self.energy_threshold or (
+            rms >= self.energy_threshold / 2 and zcr >= self.zcr_threshold)
+
+    def process(self, frame):
+        self.total_frames += 1
+        if self.is_speech(frame):
+            chunks = [] if self.active else list(self.preroll)
+            self.preroll.clear()
+            chunks.append(frame)
+            self.active = True
+            self.hangover = self.hangover_frames
+            self.forwarded_frames += len(chunks)
+            return chunks, False
+
+        if self.active:
+            if self.hangover > 0:
+                self.hangover -= 1
+                self.forwarded_frames += 1
+                return [frame], False
+            self.active = False
+            self.preroll.append(frame)
+            return [], True
+
+        self.preroll.append(frame)
+        return [], False
+
+    def record_decode(self, seconds):
+        self.decode_seconds += seconds
+        self.decoded_frames += 1
+
+    @property
+    def skipped_fraction(self):
+        if not self.total_frames:
+            return 0.0
+        return 1 - self.forwarded_frames / self.total_frames
+
+    @property
+    def cpu_saved_seconds(self):
+        if not self.decoded_frames:
+            return 0.0
+        skipped = self.total_frames - self.forwarded_frames
+        return skipped * self.decode_seconds / self.decoded_frames
+
+    def status(self):
+        return (f"VAD skipped {self.skipped_fraction * 100:.0f}% of audio, "
+                f"saving ~{self.cpu_saved_seconds:.1f} s of decoder CPU")
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+from .audio import AudioCapture, sample_rate
+from .console import report
+from .quantities import lexicon
+from .startup import timed_import, timed_stage
+from . import tracing
+from .vad import VoiceActivityGate
+
+default_model_path = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vosk-model-en-in-0.5')
+
+
+def build_grammar():
+    from dataset import commands as command_phrases
+    words = {word for word in lexicon if word.isalpha() and len(word) > 1}
+    for phrases in command_phrases.values():
+        for phrase in phrases:
+            words.update(word for word in phrase.split() if not word.isdigit())
+    return json.dumps(sorted(words) + ["[unk]"])
+
+
+# Big models such as vosk-model-en-in-0.5 ship a static HCLG graph, and Vosk
+# ignores a runtime grammar on them with only a log warning. Grammar decoding
+# needs a model with a lookahead graph (HCLr.fst + Gr.fst), i.e. one of the
+# small models like vosk-model-small-en-in-0.4.
+def supports_grammar(model_path=default_model_path):
+    graph = os.path.join(model_path, 'graph')
+    return (not os.path.exists(os.path.join(graph, 'HCLG.fst')) and
+            os.path.exists(os.path.join(graph, 'HCLr.fst')) and os.path.exists(os.path.join(graph, 'Gr.fst')))
+
+
+def grammar_for(model_path=default_model_path):
+    if supports_grammar(model_path):
+        return build_grammar()
+    report(f"{os.path.basename(os.path.normpath(model_path))} has a static graph, so --grammar has no effect; "
+           f"use a small model such as vosk-model-small-en-in-0.4.", style="bold yellow")
+    return None
+
+
+def load_vosk_model(model_path=default_model_path):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError("Vosk model directory not found.")
+    vosk = timed_import('vosk')
+    return timed_stage("Vosk model", vosk.Model, model_path)
+
+
+def create_recognizer(vosk_model, rate=sample_rate, grammar=None):
+    from vosk import KaldiRecognizer
+    if grammar is None:
+        return KaldiRecognizer(vosk_model, rate)
+    return KaldiRecognizer(vosk_model, rate, grammar)
+
+
+def final_transcript(result, timestamp):
+    tracing.mark("transcript")
+    text = json.loads(result).get("text", "")
+    if text == "":
+        report("Sorry, I did not understand the audio.", style="bold red")
+        return None, True, timestamp
+
+    report(f"Recognized command: {text}", style="bold green")
+    return text, True, timestamp
+
+
+class VoskFrontend:
+    name = "vosk"
+    live = True
+
+    def __init__(self, model_path=default_model_path, use_grammar=False, partials=False,
+                 use_vad=True, vad_energy_threshold=300.0, vad_zcr_threshold=0.3,
+                 vad_hangover_frames=4, vad_preroll_frames=2):
+        self.model_path = model_path
+        self.use_grammar = use_grammar
+        self.partials = partials
+        self.use_vad = use_vad
+        self.vad_settings = (vad_energy_threshold, vad_zcr_threshold,
+                             vad_hangover_frames, vad_preroll_frames)
+        self.vosk_model = None
+        self.capture = None
+
+    def load(self):
+        self.vosk_model = load_vosk_model(self.model_path)
+        return self.vosk_model
+
+    def start(self):
+        self.capture = AudioCapture()
+        self.capture.start()
+
+    def stop(self):
+        if self.capture is not None:
+            self.capture.stop()
+
+    def transcripts(self):
+        grammar = grammar_for(self.model_path) if self.use_grammar else None
+        recognizer = create_recognizer(self.vosk_model, self.capture.rate, grammar)
+        gate = VoiceActivityGate(*self.vad_settings) if self.use_vad else None
+        report("Listening for commands...", style="bold blue")
+
+        for timestamp, data in self.capture.frames():
+            chunks, segment_ended = gate.process(data) if gate else ([data], False)
+            if chunks:
+                tracing.begin(timestamp)
+            for chunk in chunks:
+                started = time.process_time()
+                accepted = recognizer.AcceptWaveform(chunk)
+                if gate:
+                    gate.record_decode(time.process_time() - started)
+                if accepted:
+                    tracing.mark("end_of_speech", timestamp)
+                    result = recognizer.Result()
+                    recognizer.Reset()
+                    yield final_transcript(result, timestamp)
+                elif self.partials:
+                    partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                    if partial:
+                        yield partial, False, timestamp
+
+            if segment_ended:
+                tracing.mark("end_of_speech", timestamp)
+                result = recognizer.FinalResult()
+                recognizer.Reset()
+                if json.loads(result).get("text", ""):
+                    yield final_transcript(result, timestamp)
+                else:
+                    tracing.mark("transcript")
+                report(gate.status(), style="dim")
@@ -0,0 +1,63 @@
+import os
+import time
+import wave
+
+from .console import report
+from . import tracing
+from .vosk_frontend import default_model_path, load_vosk_model, create_recognizer, grammar_for, final_transcript
+
+chunk_frames = 4000
+
+
+def collect_wavs(paths):
+    wavs = []
+    for path in paths:
+        if os.path.isdir(path):
+            wavs.extend(os.path.join(path, name)
+                        for name in sorted(os.listdir(path)) if name.lower().endswith('.wav'))
+        else:
+            wavs.append(path)
+    return wavs
+
+
+class WavFrontend:
+    name = "wav"
+    live = False
+
+    def __init__(self, paths, model_path=default_model_path, use_grammar=False):
+        self.paths = paths
+        self.model_path = model_path
+        self.use_grammar = use_grammar
+        self.vosk_model = None
+
+    def load(self):
+        self.vosk_model = load_vosk_model(self.model_path)
+        return self.vosk_model
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def transcripts(self):
+        grammar = grammar_for(self.model_path) if self.use_grammar else None
+        for path in collect_wavs(self.paths):
+            report(f"Transcribing {path}", style="bold blue")
+            with wave.open(path, 'rb') as wf:
+                if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                    report(f"Skipping {path}: expected 16-bit mono PCM.", style="bold red")
+                    continue
+                recognizer = create_recognizer(self.vosk_model, wf.getframerate(), grammar)
+                while True:
+                    data = wf.readframes(chunk_frames)
+                    if len(data) == 0:
+                        break
+                    tracing.begin()
+                    if recognizer.AcceptWaveform(data):
+                        tracing.mark("end_of_speech")
+                        yield final_transcript(recognizer.Result(), time.monotonic())
+                tracing.mark("end_of_speech")
+                text, final, timestamp = final_transcript(recognizer.FinalResult(), time.monotonic())
+                if text:
+                    yield text, final, timestamp
@@ -0,0 +1,98 @@
+import random
+import string
+from car_engine.quantities import parse, lexicon, small_numbers, tens, unit_words
+
+
+def spell(number):
+    ones = {value: word for word, value in small_numbers.items()}
+    tens_words = {value: word for word, value in tens.items()}
+    words = []
+    if number >= 1000:
+        words += spell(number // 1000) + ["thousand"]
+        number %= 1000
+    if number >= 100:
+        words += [ones[number // 100], "hundred"]
+        number %= 100
+        if number:
+            words.append("and")
+    if number >= 20:
+        words.append(tens_words[number // 10 * 10])
+        number %= 10
+    if number or not words:
+        words.append(ones[number])
+    return words
+
+
+def main():
+    rng = random.Random(1234)
+    checks = 0
+    failures = []
+
+    def expect(text, expected):
+        nonlocal checks
+        checks += 1
+        actual = [[(round(q.value, 6), q.unit) for q in clause.quantities] for clause in parse(text)]
+        if actual != expected:
+            failures.append((text, expected, actual))
+
+    # Fixed cases from the transcripts that used to go wrong.
+    expect("move forward one hundred and twenty centimeters", [[(120, "cm")]])
+    expect("go back two point five meters", [[(250.0, "cm")]])
+    expect("turn left forty five degrees", [[(45, "deg")]])
+    expect("forward 20 cm and turn right 90°", [[(20, "cm")], [(90, "deg")]])
+    expect("forward twenty-five and left a hundred", [[(25, None)], [(100, None)]])
+    expect("reverse for 2 seconds", [[(2, "s")]])
+    expect("forward 1,000 cm", [[(1000, "cm")]])
+    expect("forward 12,500.5 mm and left 1,2", [[(1250.05, "cm")], [(1, None), (2, None)]])
+    expect("go back two point fifteen meters", [[(215.0, "cm")]])
+    expect("forward 2 point 15 meters", [[(215.0, "cm")]])
+    expect("forward two point twenty-five meters", [[(225.0, "cm")]])
+    expect("forward two point one five meters", [[(215.0, "cm")]])
+    expect("forward 2 point 05 meters", [[(205.0, "cm")]])
+    # Fractions that cannot be read are dropped whole, never split into a second quantity.
+    expect("forward two point fifteen five meters and left 90", [[], [(90, None)]])
+    expect("forward 2 point 1,000 m", [[]])
+
+    # Property: any spelled or written number with any unit comes back
+    # converted, and clause count follows the "and"s between clauses.
+    units = list(unit_words)
+    for _ in range(5000):
+        clauses = []
+        expected = []
+        for _ in range(rng.randint(1, 4)):
+            number = rng.randint(0, 9999)
+            unit = rng.choice(units + [None])
+            if rng.random() < 0.2:
+                decimal = rng.randint(1, 99)
+                spoken = rng.choice([spell(number) + ["point"] + spell(decimal),
+                                     [str(number), "point", str(decimal)], [f"{number}.{decimal}"]])
+                value = number + decimal / 10 ** len(str(decimal))
+            else:
+                spoken = spell(number) if rng.random() < 0.5 else [rng.choice([str(number), f"{number:,}"])]
+                value = number
+            canonical, factor = unit_words[unit] if unit else (None, 1)
+            verb = rng.choice(["move forward", "go back", "turn left", "rotate right", "please go"])
+            clauses.append(" ".join([verb] + spoken + ([unit] if unit else [])))
+            expected.append([(round(value * factor, 6), canonical)])
+        expect(" and ".join(clauses), expected)
+
+    # Fuzz: arbitrary text never raises and never yields empty clauses.
+    alphabet = string.ascii_lowercase + string.digits + " .,-°"
+    vocabulary = list(lexicon) + ["forward", "left", "move"]
+    for _ in range(20000):
+        if rng.random() < 0.5:
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+        else:
+            text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12)))
+        checks += 1
+        if any(not clause.text for clause in parse(text)):
+            failures.append((text, "non-empty clauses", parse(text)))
+
+    for text, expected, actual in failures[:20]:
+        print(f"FAIL {text!r}: expected {expected}, got {actual}")
+    print(f"{checks - len(failures)}/{checks} checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+commands = {
+    "forward": [
+        "move forward", "go forward", "forward", "move ahead", "please move forward 10 cm",
+        "advance", "step forward", "walk forward", "go straight", "move ahead 10 cm",
+        "move forward quickly", "forward march", "proceed forward", "move up",
+        "please go forward", "can you move forward", "move 10 cm ahead", "please go ahead 10 cm", "advance 10 cm"
+    ],
+    "right": [
+        "turn right", "rotate right", "move to the right", "right",
+        "turn to the right", "rotate to the right", "swing right", "veer right", "turn 90 degrees right",
+        "move 90 degrees right", "turn 45 degrees right", "slight right turn", "hard right turn",
+        "turn sharply to the right", "rotate clockwise", "right turn", "right rotation"
+    ],
+    "backward": [
+        "move backward", "back", "go back", "please move backward",
+        "retreat", "reverse", "step back", "move back", "move back 10 cm",
+        "go backwards", "reverse 10 cm", "please reverse", "move backward quickly", "back up",
+        "can you move backward", "move 10 cm back", "reverse back", "move back slightly"
+    ],
+    "left": [
+        "turn left", "rotate left", "move to the left", "left",
+        "turn to the left", "rotate to the left", "swing left", "veer left", "turn 90 degrees left",
+        "move 90 degrees left", "turn 45 degrees left", "slight left turn", "hard left turn",
+        "turn sharply to the left", "rotate counterclockwise", "left turn", "left rotation"
+    ],
+    "headlight on": [
+        "turn on the headlight", "headlight on", "activate headlight", "switch on the headlight",
+        "enable headlight", "lights on", "headlight activation", "turn headlights on",
+        "switch headlights on", "turn the headlight on", "headlights on", "please turn on the headlight",
+        "headlight switch on", "headlight power on", "activate headlights"
+    ],
+    "headlight off": [
+        "turn off the headlight", "headlight off", "deactivate headlight", "switch off the headlight",
+        "disable headlight", "lights off", "headlight deactivation", "turn headlights off",
+        "switch headlights off", "turn the headlight off", "headlights off", "please turn off the headlight",
+        "headlight switch off", "headlight power off", "deactivate headlights"
+    ]
+}
+
+noise_phrases = ["please", "kindly", "could you", "would you", "can you", "might you"]
+filler_words = ["uh", "um", "okay", "now", "just", "hey"]
+synonyms = {
+    "move": ["go", "drive"],
+    "turn": ["rotate", "swing"],
+    "forward": ["ahead", "forwards"],
+    "backward": ["backwards", "back"],
+    "headlight": ["headlights", "lights", "lamp"],
+    "switch": ["turn"],
+}
+units = {
+    "forward": ["cm", "centimeters"],
+    "backward": ["cm", "centimeters"],
+    "right": ["degrees"],
+    "left": ["degrees"],
+}
+
+phrase_numbers = sorted({word for phrases in commands.values()
+                         for phrase in phrases for word in phrase.split() if word.isdigit()})
+
+default_config = {
+    "version": 1,
+    "seed": 42,
+    "samples_per_class": 1000,
+    "noise_rate": 0.5,
+    "filler_rate": 0.1,
+    "number_rate": 0.2,
+    "synonym_rate": 0.1,
+}
+
+cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.dataset_cache')
+
+
+def config_hash(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def pick(rng, options, size):
+    return np.asarray(options)[rng.integers(len(options), size=size)]
+
+
+def augment(rng, action, count, config):
+    # Phrases are padded with spaces so swaps only match whole words, and the
+    # dtype is widened up front so later insertions are never truncated.
+    texts = np.char.add(np.char.add(" ", pick(rng, commands[action], count)), " ").astype('<U96')
+
+    swap = rng.random(count) < config["synonym_rate"]
+    for word, replacements in synonyms.items():
+        target = f" {word} "
+        rows = np.flatnonzero(swap & (np.char.find(texts, target) >= 0))
+        if rows.size:
+            swapped = pick(rng, replacements, rows.size)
+            for replacement in np.unique(swapped):
+                chosen = rows[swapped == replacement]
+                texts[chosen] = np.char.replace(texts[chosen], target, f" {replacement} ")
+
+    if action in units:
+        insert = rng.random(count) < config["number_rate"]
+        numbers = rng.integers(1, 181, size=count)
+        has_number = np.zeros(count, dtype=bool)
+        for token in phrase_numbers:
+            contains = np.char.find(texts, f" {token} ") >= 0
+            has_number |= contains
+            rows = np.flatnonzero(insert & contains)
+            for number in np.unique(numbers[rows]):
+                chosen = rows[numbers[rows] == number]
+                texts[chosen] = np.char.replace(texts[chosen], f" {token} ", f" {number} ")
+
+        rows = np.flatnonzero(insert & ~has_number)
+        suffix = np.char.add(np.char.add(numbers[rows].astype(str), " "), pick(rng, units[action], rows.size))
+        texts[rows] = np.char.add(texts[rows], np.char.add(suffix, " "))
+
+    texts = np.char.strip(texts)
+
+    rows = np.flatnonzero(rng.random(count) < config["noise_rate"])
+    texts[rows] = np.char.add(np.char.add(pick(rng, noise_phrases, rows.size), " "), texts[rows])
+
+    rows = np.flatnonzero(rng.random(count) < config["filler_rate"])
+    texts[rows] = np.char.add(np.char.add(pick(rng, filler_words, rows.size), " "), texts[rows])
+    return texts
+
+
+def stream_samples(config=None, batch_size=100_000):
+    config = {**default_config, **(config or {})}
+    rng = np.random.default_rng(config["seed"])
+    for action in commands:
+        remaining = config["samples_per_class"]
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            yield augment(rng, action, count, config), np.full(count, action)
+            remaining -= count
+
+
+def build_dataset(config=None, use_cache=True):
+    config = {**default_config, **(config or {})}
+    path = os.path.join(cache_dir, f"dataset-{config_hash(config)}.npz")
+    if use_cache and os.path.exists(path):
+        with np.load(path) as cached:
+            return pd.DataFrame({"command": cached["command"], "action": cached["action"]})
+
+    batches = list(stream_samples(config))
+    command = np.concatenate([texts for texts, _ in batches])
+    action = np.concatenate([labels for _, labels in batches])
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez_compressed(path, command=command, action=action)
+    return pd.DataFrame({"command": command, "action": action})
@@ -1,15 +1,22 @@
 import serial
 from pynput import keyboard
+import threading
 import time
 import sys
 from rich import print
 from rich.console import Console
+from car_engine.protocol import encode_frame, encode_legacy, negotiate_version, PROTOCOL_VERSION
 
 console = Console()
 
 SERIAL_PORT = 'COM13'
 BAUD_RATE = 9600
 
+MAX_SEND_RATE = 20
+KEEPALIVE_INTERVAL = 0.1
+DEADMAN_TIMEOUT = 0.3
+MAX_RETRY_BACKOFF = 2.0
+
 
 def create_serial_connection():
     attempts = 0
@@ -29,90 +36,210 @@ def create_serial_connection():
     return None
 
 
+key_mapping = {
+    keyboard.Key.up: 'forward',
+    keyboard.Key.down: 'backward',
+    keyboard.Key.right: 'right',
+    keyboard.Key.left: 'left',
+    'w': 'forward',
+    's': 'backward',
+    'd': 'right',
+    'a': 'left',
+    ' ': 'brake',
+    'h': 'headlight on',
+    'k': 'headlight off',
+    'o': 'quit',
+    keyboard.Key.esc: 'quit'
+}
+
+event_opcodes = {
+    'headlight on': '5',
+    'headlight off': '6'
+}
+
+# (forward/backward, right/left) -> opcode; diagonals drive one side only.
+motion_opcodes = {
+    (0, 0): '0',
+    (1, 0): '1',
+    (-1, 0): '2',
+    (0, 1): '3',
+    (0, -1): '4',
+    (1, -1): '7',
+    (1, 1): '8',
+    (-1, -1): '9',
+    (-1, 1): '10'
+}
+
+motion_names = {
+    '0': 'stop', '1': 'forward', '2': 'backward', '3': 'right', '4': 'left',
+    '7': 'forward-left', '8': 'forward-right', '9': 'backward-left', '10': 'backward-right'
+}
+
+
+axis_actions = ('forward', 'backward', 'right', 'left')
+
+
+# held lists the pressed actions in press order.
+def resolve_motion(held, diagonals=True):
+    if 'brake' in held:
+        return '0'
+    longitudinal = ('forward' in held) - ('backward' in held)
+    lateral = ('right' in held) - ('left' in held)
+    if longitudinal and lateral and not diagonals:
+        # Legacy firmware ignores the arc opcodes; follow the axis pressed last instead.
+        last = next(action for action in reversed(held) if action in axis_actions)
+        if last in ('forward', 'backward'):
+            lateral = 0
+        else:
+            longitudinal = 0
+    return motion_opcodes[(longitudinal, lateral)]
+
+
+class ControlState:
+    def __init__(self, ser, protocol_version):
+        self.ser = ser
+        self.protocol_version = protocol_version
+        self.keepalive = protocol_version >= PROTOCOL_VERSION
+        self.diagonals = protocol_version >= PROTOCOL_VERSION
+        self.held = []
+        self.events = []
+        self.desired = '0'
+        self.sent = None
+        self.last_sent_at = 0.0
+        self.frames_sent = 0
+        self._changed = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._send_loop, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def press(self, action):
+        with self._changed:
+            # Held keys autorepeat on_press; only the first press counts.
+            if action in self.held:
+                return
+            self.held.append(action)
+            if action in event_opcodes:
+                self.events.append(event_opcodes[action])
+            else:
+                self.desired = resolve_motion(self.held, self.diagonals)
+            self._changed.notify()
+
+    def release(self, action):
+        with self._changed:
+            if action in self.held:
+                self.held.remove(action)
+            self.desired = resolve_motion(self.held, self.diagonals)
+            self._changed.notify()
+
+    def _frame(self, opcode):
+        if self.keepalive and opcode != '0':
+            # The board stops by itself if no refresh arrives within the deadman timeout.
+            return encode_frame(opcode, DEADMAN_TIMEOUT * 1000)
+        return encode_legacy(opcode)
+
+    def _send_loop(self):
+        min_interval = 1.0 / MAX_SEND_RATE
+        failures = 0
+        while True:
+            with self._changed:
+                while self._running and not self.events and self.desired == self.sent and (
+                        not self.keepalive or self.desired == '0' or
+                        time.monotonic() - self.last_sent_at < KEEPALIVE_INTERVAL):
+                    timeout = KEEPALIVE_INTERVAL if self.keepalive and self.desired != '0' else None
+                    self._changed.wait(timeout)
+                if not self._running:
+                    return
+                events, self.events = self.events, []
+                desired = self.desired
+
+            wait = self.last_sent_at + min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+                with self._changed:
+                    desired = self.desired
+
+            frames = [encode_legacy(opcode) for opcode in events] + [self._frame(desired)]
+            try:
+                self.ser.write(b''.join(frames))
+            except serial.SerialException as e:
+                if not self.ser.is_open:
+                    console.print(f'[bold red]Serial port closed:[/bold red] {e}')
+                    return
+                if failures == 0:
+                    console.print(f'[bold red]Serial write failed, retrying:[/bold red] {e}')
+                failures += 1
+                with self._changed:
+                    self.events[:0] = events
+                time.sleep(min(min_interval * 2 ** failures, MAX_RETRY_BACKOFF))
+                continue
+            if failures:
+                console.print(f'[bold green]Serial writes recovered after {failures} failures[/bold green]')
+                failures = 0
+            if desired != self.sent:
+                console.print(f'[bold cyan]Motion:[/bold cyan] {motion_names[desired]}')
+            self.sent = desired
+            self.last_sent_at = time.monotonic()
+            self.frames_sent += len(frames)
+
+    def stop(self):
+        with self._changed:
+            self._running = False
+            self._changed.notify()
+        self._thread.join(timeout=1)
+        try:
+            self.ser.write(encode_legacy('0'))
+        except serial.SerialException as e:
+            console.print(f'[bold red]Could not send the final stop:[/bold red] {e}')
+
+
 ser = create_serial_connection()
 if ser is None:
     raise SystemExit(
         '[bold red]Unable to establish serial connection[/bold red]')
 
-key_mapping = {
-    keyboard.Key.up: '1',
-    keyboard.Key.down: '2',
-    keyboard.Key.right: '3',
-    keyboard.Key.left: '4',
-    'w': '1',
-    's': '2',
-    'd': '3',
-    'a': '4',
-    ' ': '0',
-    'h': '5',
-    'k': '6',
-    'o': 'STOP'
-}
+protocol_version = negotiate_version(ser)
+if protocol_version < PROTOCOL_VERSION:
+    console.print(
+        '[bold yellow]Legacy firmware: no on-board deadman, the car keeps moving if this host stalls[/bold yellow]')
 
+control = ControlState(ser, protocol_version)
 
-pressed_keys = set()
+
+def key_action(key):
+    if hasattr(key, 'char') and key.char in key_mapping:
+        return key.char
+    if key in key_mapping:
+        return key
+    return None
 
 
 def on_press(key):
-    try:
-        if hasattr(key, 'char') and key.char in key_mapping:
-            if key.char not in pressed_keys:
-                pressed_keys.add(key.char)
-                send_key_data(key.char)
-                console.print(
-                    f'[bold cyan]Key pressed:[/bold cyan] {key_mapping[key.char]}')
-                if key.char == 'o':
-                    console.print('[bold red]Stopping program...[/bold red]')
-                    return False
-        elif key in key_mapping:
-            if key not in pressed_keys:
-                pressed_keys.add(key)
-                send_key_data(key)
-                console.print(
-                    f'[bold cyan]Key pressed:[/bold cyan] {key_mapping[key]}')
-                if key == keyboard.Key.esc:
-                    console.print('[bold red]Stopping program...[/bold red]')
-                    return False
-    except AttributeError:
-        if key in key_mapping and key not in pressed_keys:
-            pressed_keys.add(key)
-            send_key_data(key)
-            console.print(
-                f'[bold cyan]Key pressed:[/bold cyan] {key_mapping[key]}')
+    action_key = key_action(key)
+    if action_key is None:
+        return
+    action = key_mapping[action_key]
+    if action == 'quit':
+        console.print('[bold red]Stopping program...[/bold red]')
+        return False
+    control.press(action)
 
 
 def on_release(key):
-    try:
-        if hasattr(key, 'char') and key.char in key_mapping:
-            if key.char in pressed_keys:
-                pressed_keys.discard(key.char)
-                console.print(
-                    f'[bold yellow]Key released:[/bold yellow] {key_mapping[key.char]}')
-                ser.write(b'0\n')
-        elif key in key_mapping:
-            if key in pressed_keys:
-                pressed_keys.discard(key)
-                console.print(
-                    f'[bold yellow]Key released:[/bold yellow] {key_mapping[key]}')
-                ser.write(b'0\n')
-    except AttributeError:
-        if key in key_mapping:
-            if key in pressed_keys:
-                pressed_keys.discard(key)
-                console.print(
-                    f'[bold yellow]Key released:[/bold yellow] {key_mapping[key]}')
-                ser.write(b'0\n')
-
-
-def send_key_data(key):
-    if key in key_mapping:
-        ser.write((key_mapping[key] + '\n').encode())
+    action_key = key_action(key)
+    if action_key is None:
+        return
+    control.release(key_mapping[action_key])
 
 
+control.start()
 try:
     with keyboard.Listener(on_press=on_press, on_release=on_release) as listener:
         listener.join()
 except KeyboardInterrupt:
     pass
 
+control.stop()
+console.print(f'[bold green]Sent {control.frames_sent} frames[/bold green]')
 ser.close()
@@ -1,86 +1,153 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import joblib
-from sklearn.metrics import classification_report
+import numpy as np
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.metrics import classification_report, accuracy_score
 from sklearn.pipeline import make_pipeline
-from sklearn.svm import SVC
+from sklearn.svm import SVC, LinearSVC
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
-import pandas as pd
-import random
-commands = {
-    "forward": [
-        "move forward", "go forward", "forward", "move ahead", "please move forward 10 cm",
-        "advance", "step forward", "walk forward", "go straight", "move ahead 10 cm",
-        "move forward quickly", "forward march", "proceed forward", "move up",
-        "please go forward", "can you move forward", "move 10 cm ahead", "please go ahead 10 cm", "advance 10 cm"
-    ],
-    "right": [
-        "turn right", "rotate right", "move to the right", "right",
-        "turn to the right", "rotate to the right", "swing right", "veer right", "turn 90 degrees right",
-        "move 90 degrees right", "turn 45 degrees right", "slight right turn", "hard right turn",
-        "turn sharply to the right", "rotate clockwise", "right turn", "right rotation"
-    ],
-    "backward": [
-        "move backward", "back", "go back", "please move backward",
-        "retreat", "reverse", "step back", "move back", "move back 10 cm",
-        "go backwards", "reverse 10 cm", "please reverse", "move backward quickly", "back up",
-        "can you move backward", "move 10 cm back", "reverse back", "move back slightly"
-    ],
-    "left": [
-        "turn left", "rotate left", "move to the left", "left",
-        "turn to the left", "rotate to the left", "swing left", "veer left", "turn 90 degrees left",
-        "move 90 degrees left", "turn 45 degrees left", "slight left turn", "hard left turn",
-        "turn sharply to the left", "rotate counterclockwise", "left turn", "left rotation"
-    ],
-    "headlight on": [
-        "turn on the headlight", "headlight on", "activate headlight", "switch on the headlight",
-        "enable headlight", "lights on", "headlight activation", "turn headlights on",
-        "switch headlights on", "turn the headlight on", "headlights on", "please turn on the headlight",
-        "headlight switch on", "headlight power on", "activate headlights"
-    ],
-    "headlight off": [
-        "turn off the headlight", "headlight off", "deactivate headlight", "switch off the headlight",
-        "disable headlight", "lights off", "headlight deactivation", "turn headlights off",
-        "switch headlights off", "turn the headlight off", "headlights off", "please turn off the headlight",
-        "headlight switch off", "headlight power off", "deactivate headlights"
-    ]
+from car_engine.linear_model import compile_pipeline, classify_many
+from dataset import build_dataset
+
+model_path = 'voice_command_model.pkl'
+
+vectorizer_grid = {
+    "word 1-gram": dict(),
+    "word 1-2-gram": dict(ngram_range=(1, 2)),
+    "char_wb 2-4-gram": dict(analyzer='char_wb', ngram_range=(2, 4)),
+}
+
+estimator_grid = {
+    "SVC linear": [dict(kernel='linear', probability=True, C=c) for c in (0.1, 1.0, 10.0)],
+    "LinearSVC": [dict(C=c) for c in (0.1, 1.0, 10.0)],
+    "LogisticRegression": [dict(C=c, max_iter=1000) for c in (1.0, 10.0)],
+    "SGDClassifier": [dict(loss='log_loss', alpha=a, random_state=42) for a in (1e-5, 1e-4)],
+}
+
+# LinearSVC has no predict_proba; without calibration every confidence would be
+# None and the engine's min_confidence rejection would silently switch off.
+def calibrated_linear_svc(**params):
+    return CalibratedClassifierCV(LinearSVC(**params))
+
+
+estimators = {
+    "SVC linear": SVC,
+    "LinearSVC": calibrated_linear_svc,
+    "LogisticRegression": LogisticRegression,
+    "SGDClassifier": SGDClassifier,
 }
 
 
-def generate_variations(base_commands, num_variations):
-    variations = []
-    noise_phrases = ["please", "kindly", "could you",
-                     "would you", "can you", "might you"]
-    for command in base_commands:
-        for _ in range(num_variations):
-            noise = random.choice(noise_phrases)
-            cmd_variation = f"{noise} {command}"
-            variations.append(cmd_variation)
-            # Add the base command itself for diversity
-            variations.append(command)
-    return variations
+def build_model(vectorizer_name="word 1-gram", estimator_name="SVC linear", params=None):
+    params = params if params is not None else dict(kernel='linear', probability=True)
+    return make_pipeline(TfidfVectorizer(**vectorizer_grid[vectorizer_name]),
+                         estimators[estimator_name](**params))
+
+
+def search_space():
+    for vectorizer_name in vectorizer_grid:
+        for estimator_name, param_sets in estimator_grid.items():
+            for params in param_sets:
+                yield {"vectorizer": vectorizer_name, "estimator": estimator_name, "params": params}
+
+
+# The engine runs exportable pipelines through the compiled NumPy scorer and
+# everything else through sklearn, so candidates are timed the same way.
+def deployed_classifier(model):
+    try:
+        return compile_pipeline(model), True
+    except (ValueError, AttributeError):
+        return model, False
+
+
+def single_utterance_latency(classifier, texts):
+    classify_many(classifier, texts[:10])
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        classify_many(classifier, [text])
+        timings.append((time.perf_counter() - started) * 1e6)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 99))
+
+
+def fit_and_score(config, X_train, y_train, X_test, y_test):
+    model = build_model(config["vectorizer"], config["estimator"], config["params"])
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+    return model, {**config, "accuracy": accuracy, "fit_seconds": fit_seconds}
+
+
+def pareto_front(results):
+    front = []
+    for result in results:
+        dominated = any(
+            other["accuracy"] >= result["accuracy"] and other["p99_us"] <= result["p99_us"] and
+            (other["accuracy"] > result["accuracy"] or other["p99_us"] < result["p99_us"])
+            for other in results)
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: (-result["accuracy"], result["p50_us"]))
+
+
+def search(X_train, y_train, X_test, y_test, n_jobs=None, latency_samples=500):
+    configs = list(search_space())
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = [executor.submit(fit_and_score, config, X_train, y_train, X_test, y_test)
+                   for config in configs]
+        fitted = [future.result() for future in futures]
 
+    # Latency is timed here, one model at a time, so parallel fits do not skew it.
+    texts = list(X_test[:latency_samples])
+    results = []
+    for model, result in fitted:
+        classifier, compiled = deployed_classifier(model)
+        if classify_many(classifier, texts[:1])[0][1] is None:
+            print(f"Skipping {result['vectorizer']} + {result['estimator']}: no confidence scores")
+            continue
+        p50, p99 = single_utterance_latency(classifier, texts)
+        results.append({**result, "compiled": compiled, "p50_us": p50, "p99_us": p99})
+    return results, pareto_front(results)
 
-data = []
-for action, cmds in commands.items():
-    variations = generate_variations(cmds, 500 // len(cmds))
-    data.extend([{"command": cmd, "action": action} for cmd in variations])
 
-for action in commands.keys():
-    while len([d for d in data if d["action"] == action]) < 1000:
-        cmd = random.choice(commands[action])
-        data.append({"command": cmd, "action": action})
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the voice command classifier.")
+    parser.add_argument('--search', action='store_true',
+                        help="search vectorizer/estimator configs and keep the Pareto-best one")
+    parser.add_argument('--n-jobs', type=int, default=None, help="worker processes for --search")
+    args = parser.parse_args()
 
-df = pd.DataFrame(data)
+    df = build_dataset()
 
-X_train, X_test, y_train, y_test = train_test_split(
-    df['command'], df['action'], test_size=0.2, random_state=42, stratify=df['action'])
+    X_train, X_test, y_train, y_test = train_test_split(
+        df['command'], df['action'], test_size=0.2, random_state=42, stratify=df['action'])
 
+    config = {"vectorizer": "word 1-gram", "estimator": "SVC linear",
+              "params": dict(kernel='linear', probability=True)}
+    if args.search:
+        results, front = search(X_train, y_train, X_test, y_test, args.n_jobs)
+        for result in front:
+            print(f"{result['vectorizer']:<18}{result['estimator']:<20}{json.dumps(result['params']):<60}"
+                  f"acc {result['accuracy']:.4f}  p50 {result['p50_us']:.0f} us  p99 {result['p99_us']:.0f} us"
+                  f"{'  compiled' if result['compiled'] else ''}")
+        best = front[0]
+        config = {key: best[key] for key in ("vectorizer", "estimator", "params")}
+        report_path = os.path.splitext(model_path)[0] + '.search.json'
+        with open(report_path, 'w') as f:
+            json.dump({"selected": best, "pareto_front": front, "results": results}, f, indent=2)
+        print(f"Selected {best['vectorizer']} + {best['estimator']}; report written to {report_path}")
 
-model = make_pipeline(TfidfVectorizer(), SVC(
-    kernel='linear', probability=True))
-model.fit(X_train, y_train)
+    model = build_model(config["vectorizer"], config["estimator"], config["params"])
+    model.fit(X_train, y_train)
 
-y_pred = model.predict(X_test)
-print(classification_report(y_test, y_pred))
+    y_pred = model.predict(X_test)
+    print(classification_report(y_test, y_pred))
 
-joblib.dump(model, 'voice_command_model.pkl')
+    joblib.dump(model, model_path)
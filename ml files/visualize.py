@@ -1,81 +1,42 @@
-import joblib
+import argparse
+import os
+
+parser = argparse.ArgumentParser(description="Evaluate the voice command classifier and plot the results.")
+parser.add_argument("--output-dir", default="reports",
+                    help="directory the figures are written to")
+parser.add_argument("--show", action="store_true",
+                    help="also open the figures in a window after saving them")
+parser.add_argument("--grid-points", type=int, default=40000,
+                    help="maximum number of points the decision grid may classify")
+parser.add_argument("--max-scatter", type=int, default=5000,
+                    help="maximum number of samples projected, fitted and plotted in the boundary plot")
+args = parser.parse_args()
+
+import matplotlib
+if not args.show:
+    matplotlib.use("Agg")
+
 from sklearn.metrics import classification_report, ConfusionMatrixDisplay
 from sklearn.pipeline import make_pipeline
 from sklearn.svm import SVC
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.model_selection import train_test_split
 import pandas as pd
-import random
 import matplotlib.pyplot as plt
 import seaborn as sns
 from rich import print
 from rich.console import Console
 from rich.table import Table
-from sklearn.decomposition import PCA
+from sklearn.decomposition import TruncatedSVD
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
+from car_engine.linear_model import classify_many
+from dataset import build_dataset
 
 console = Console()
+os.makedirs(args.output_dir, exist_ok=True)
 
-commands = {
-    "forward": [
-        "move forward", "go forward", "forward", "move ahead", "please move forward 10 cm",
-        "advance", "step forward", "walk forward", "go straight", "move ahead 10 cm",
-        "move forward quickly", "forward march", "proceed forward", "move up",
-        "please go forward", "can you move forward", "move 10 cm ahead", "please go ahead 10 cm", "advance 10 cm"
-    ],
-    "right": [
-        "turn right", "rotate right", "move to the right", "right",
-        "turn to the right", "rotate to the right", "swing right", "veer right", "turn 90 degrees right",
-        "move 90 degrees right", "turn 45 degrees right", "slight right turn", "hard right turn",
-        "turn sharply to the right", "rotate clockwise", "right turn", "right rotation"
-    ],
-    "backward": [
-        "move backward", "back", "go back", "please move backward",
-        "retreat", "reverse", "step back", "move back", "move back 10 cm",
-        "go backwards", "reverse 10 cm", "please reverse", "move backward quickly", "back up",
-        "can you move backward", "move 10 cm back", "reverse back", "move back slightly"
-    ],
-    "left": [
-        "turn left", "rotate left", "move to the left", "left",
-        "turn to the left", "rotate to the left", "swing left", "veer left", "turn 90 degrees left",
-        "move 90 degrees left", "turn 45 degrees left", "slight left turn", "hard left turn",
-        "turn sharply to the left", "rotate counterclockwise", "left turn", "left rotation"
-    ],
-    "headlight on": [
-        "turn on the headlight", "headlight on", "activate headlight", "switch on the headlight",
-        "enable headlight", "lights on", "headlight activation", "turn headlights on",
-        "switch headlights on", "turn the headlight on", "headlights on", "please turn on the headlight",
-        "headlight switch on", "headlight power on", "activate headlights"
-    ],
-    "headlight off": [
-        "turn off the headlight", "headlight off", "deactivate headlight", "switch off the headlight",
-        "disable headlight", "lights off", "headlight deactivation", "turn headlights off",
-        "switch headlights off", "turn the headlight off", "headlights off", "please turn off the headlight",
-        "headlight switch off", "headlight power off", "deactivate headlights"
-    ]
-}
-
-
-def generate_variations(commands, num_variations):
-    variations = []
-    for cmd in commands:
-        for _ in range(num_variations):
-            variations.append(cmd)
-    return variations
-
-
-data = []
-for action, cmds in commands.items():
-    variations = generate_variations(cmds, 500 // len(cmds))
-    data.extend([{"command": cmd, "action": action} for cmd in variations])
-
-for action in commands.keys():
-    while len([d for d in data if d["action"] == action]) < 1000:
-        cmd = random.choice(commands[action])
-        data.append({"command": cmd, "action": action})
-
-df = pd.DataFrame(data)
+df = build_dataset()
 
 df['command'] = df['command'].astype(str)
 
@@ -89,7 +50,7 @@ model = make_pipeline(TfidfVectorizer(), SVC(
     kernel='linear', probability=True))
 model.fit(X_train, y_train)
 
-y_pred = model.predict(X_test)
+y_pred = np.array([label for label, _ in classify_many(model, X_test)])
 report = classification_report(y_test, y_pred, output_dict=True)
 
 table = Table(show_header=True, header_style="bold magenta")
@@ -112,24 +73,78 @@ for label, metrics in report.items():
 
 console.print(table)
 
+
+def save_figure(fig, name):
+    path = os.path.join(args.output_dir, name)
+    fig.savefig(path, dpi=120, bbox_inches='tight')
+    console.print(f"[green]Saved {path}[/green]")
+    if not args.show:
+        plt.close(fig)
+
+
 fig1, ax1 = plt.subplots(figsize=(8, 6))
-cm = ConfusionMatrixDisplay.from_estimator(
-    model, X_test, y_test, cmap=plt.cm.Blues, normalize='true', ax=ax1
+ConfusionMatrixDisplay.from_predictions(
+    y_test, y_pred, cmap=plt.cm.Blues, normalize='true', ax=ax1
 )
 ax1.set_title('Confusion Matrix')
-plt.show(block=False)
+save_figure(fig1, 'confusion_matrix.png')
 
 fig2, ax2 = plt.subplots(figsize=(10, 7))
 df_report = pd.DataFrame(report).transpose()
 sns.heatmap(df_report[['precision', 'recall', 'f1-score']
                       ].astype(float), annot=True, cmap='Blues', fmt='.2f', ax=ax2)
 ax2.set_title('Classification Report Heatmap')
-plt.show(block=False)
-
-
-def plot_svm_boundary(X, y, model):
-    pca = PCA(n_components=2)
-    X_reduced = pca.fit_transform(X)
+save_figure(fig2, 'classification_report.png')
+
+
+def grid_axes(x_range, y_range, n_points):
+    width, height = x_range[1] - x_range[0], y_range[1] - y_range[0]
+    nx = max(2, int(np.sqrt(n_points * width / height)))
+    ny = max(2, n_points // nx)
+    return np.linspace(*x_range, nx), np.linspace(*y_range, ny)
+
+
+def decision_grid(classifier, x_range, y_range, max_points, refine=4):
+    # Classify a coarse grid first, then spend the rest of the budget
+    # re-classifying only the coarse cells that straddle a class boundary.
+    xs, ys = grid_axes(x_range, y_range, max(4, max_points // 4))
+    xx, yy = np.meshgrid(xs, ys)
+    coarse = classifier.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
+    budget = max_points - coarse.size
+
+    boundary = np.zeros(coarse.shape, dtype=bool)
+    horizontal = coarse[:, 1:] != coarse[:, :-1]
+    vertical = coarse[1:, :] != coarse[:-1, :]
+    boundary[:, 1:] |= horizontal
+    boundary[:, :-1] |= horizontal
+    boundary[1:, :] |= vertical
+    boundary[:-1, :] |= vertical
+
+    while refine > 1 and boundary.sum() * refine * refine > budget:
+        refine -= 1
+    if refine == 1:
+        return xx, yy, coarse
+
+    fine_xs = np.linspace(xs[0], xs[-1], (len(xs) - 1) * refine + 1)
+    fine_ys = np.linspace(ys[0], ys[-1], (len(ys) - 1) * refine + 1)
+    fine_xx, fine_yy = np.meshgrid(fine_xs, fine_ys)
+    rows = np.minimum(np.round(np.arange(len(fine_ys)) / refine).astype(int), len(ys) - 1)
+    cols = np.minimum(np.round(np.arange(len(fine_xs)) / refine).astype(int), len(xs) - 1)
+    Z = coarse[np.ix_(rows, cols)]
+    mask = boundary[np.ix_(rows, cols)]
+    Z[mask] = classifier.predict(np.c_[fine_xx[mask], fine_yy[mask]])
+    return fine_xx, fine_yy, Z
+
+
+def plot_svm_boundary(texts, y, model):
+    if len(texts) > args.max_scatter:
+        rng = np.random.default_rng(42)
+        keep = rng.choice(len(texts), args.max_scatter, replace=False)
+        texts, y = texts[keep], y[keep]
+
+    X = model[:-1].transform(texts)
+    svd = TruncatedSVD(n_components=2, random_state=42)
+    X_reduced = svd.fit_transform(X)
 
     model_svm = SVC(kernel='linear')
     model_svm.fit(X_reduced, y)
@@ -137,13 +152,9 @@ def plot_svm_boundary(X, y, model):
     unique_labels = np.unique(y)
     colormap = plt.get_cmap('viridis', len(unique_labels))
 
-    h = .02
-    x_min, x_max = X_reduced[:, 0].min() - 1, X_reduced[:, 0].max() + 1
-    y_min, y_max = X_reduced[:, 1].min() - 1, X_reduced[:, 1].max() + 1
-    xx, yy = np.meshgrid(np.arange(x_min, x_max, h),
-                         np.arange(y_min, y_max, h))
-    Z = model_svm.predict(np.c_[xx.ravel(), yy.ravel()])
-    Z = Z.reshape(xx.shape)
+    x_min, x_max = X_reduced[:, 0].min() - 0.1, X_reduced[:, 0].max() + 0.1
+    y_min, y_max = X_reduced[:, 1].min() - 0.1, X_reduced[:, 1].max() + 0.1
+    xx, yy, Z = decision_grid(model_svm, (x_min, x_max), (y_min, y_max), args.grid_points)
 
     fig3, ax3 = plt.subplots(figsize=(10, 7))
     ax3.contourf(xx, yy, Z, alpha=0.8, cmap=colormap)
@@ -156,9 +167,10 @@ def plot_svm_boundary(X, y, model):
     ax3.legend(handles, labels, title="Commands")
 
     ax3.set_title('SVM Decision Boundary')
-    plt.show()
+    save_figure(fig3, 'decision_boundary.png')
 
 
-vectorizer = TfidfVectorizer()
-X = vectorizer.fit_transform(df['command'])
-plot_svm_boundary(X, df['encoded_action'], model)
+plot_svm_boundary(df['command'].to_numpy(), df['encoded_action'].to_numpy(), model)
+
+if args.show:
+    plt.show()